@@ -1,14 +1,23 @@
-from fastapi import FastAPI,HTTPException
+from fastapi import FastAPI,HTTPException,Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from uuid import uuid4
-from backend.utils.minio import BUCKET_NAME,s3
-from backend.utils.redis_client import redis_client,JOB_QUEUE
-from backend.utils.job import create_job,JobType
-from backend.utils.mongo import assets_col
-from backend.utils.stream_manager import start_stream,get_stream_status,stop_stream,list_active_streams
+from backend.utils.minio import BUCKET_NAME,s3,presign_get
+from backend.utils.redis_client import redis_client,JOB_QUEUE,PREVIEW_QUEUE
+from backend.utils.job import create_job,queue_for,JobType
+from backend.utils.mongo import assets_col, jobs_col, ensure_indexes
+from backend.utils.listing import list_page, DEFAULT_PAGE_SIZE
+from backend.utils.analysis import compact_metadata, project, etag_for
+from backend.utils.profiles import get_profile, profile_for_job, save_profile, list_profiles
+from backend.utils.pipeline import start_pipeline, get_pipeline, RESERVED_PARAMS
+from backend.utils.recording import render_playlist
+from ffmpeg.utils.ffmpeg import scene_rows
+from backend.utils import metrics
+from backend.utils.stream_manager import start_stream,get_stream_status,stop_stream,list_active_streams,list_ingests
 from datetime import datetime , timezone
 import json
+import time
 
 app = FastAPI(title="Video Backend")
 app.add_middleware(
@@ -19,6 +28,34 @@ app.add_middleware(
     allow_headers = ["*"],
 )
 
+@app.on_event("startup")
+def create_indexes():
+    ensure_indexes()
+
+metrics.describe("vdo_http_request_seconds", "histogram", "API request latency by route")
+metrics.describe("vdo_job_queue_depth", "gauge", "Jobs waiting in the Redis queue")
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    # Label by route template, not raw path, to keep cardinality bounded
+    route = request.scope.get("route")
+    metrics.observe(
+        "vdo_http_request_seconds",
+        time.perf_counter() - started,
+        method=request.method,
+        route=getattr(route, "path", "unmatched"),
+        status=response.status_code,
+    )
+    return response
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    metrics.set_gauge("vdo_job_queue_depth", redis_client.llen(JOB_QUEUE), lane="default")
+    metrics.set_gauge("vdo_job_queue_depth", redis_client.llen(PREVIEW_QUEUE), lane="preview")
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 class UploadURLResponse(BaseModel):
     asset_id: str
     upload_url: str
@@ -26,6 +63,8 @@ class UploadURLResponse(BaseModel):
 class CreateJobRequest(BaseModel):
     asset_ids: list[str]
     job_type: JobType
+    params: dict | None = None  # e.g. {"thumbnails": true} on normalize, {"steps": [...]} on pipeline
+    profile: str = "default"    # encoding profile name, see GET /profiles
 
 class JobResponse(BaseModel):
     job_id: str
@@ -63,34 +102,216 @@ async def get_upload_url():
     }
 
 @app.get("/assets/{asset_id}/stream")
-async def stream_video(asset_id: str):
-    key = f"raw/{asset_id}.mp4"
+async def stream_video(asset_id: str, request: Request):
+    """
+    Best rendition available right now: the normalized file, else the
+    preview proxy, else the raw upload.
+    """
+    asset = assets_col.find_one({"_id": asset_id}, {"kind": 1, "normalized_key": 1, "preview_key": 1})
+    if asset and asset.get("kind") == "recording":
+        # Recordings are segment playlists — segments are signed per request
+        return {"stream_url": str(request.url_for("recording_playlist", asset_id=asset_id)), "rendition": "recording"}
 
-    url = s3.generate_presigned_url(
-        "get_object",
-        Params={
-            "Bucket": BUCKET_NAME,
-            "Key": key,
-        },
-        ExpiresIn=3600,
+    asset = asset or {}
+    if asset.get("normalized_key"):
+        key, rendition = asset["normalized_key"], "normalized"
+    elif asset.get("preview_key"):
+        key, rendition = asset["preview_key"], "preview"
+    else:
+        key, rendition = f"raw/{asset_id}.mp4", "raw"
+
+    url = presign_get(key)
+
+    return {"stream_url": url, "rendition": rendition}
+
+@app.get("/assets/{asset_id}/playlist.m3u8", name="recording_playlist")
+async def recording_playlist(asset_id: str):
+    """
+    HLS playlist for a live-to-VOD recording, with presigned segment URLs.
+    EVENT while the camera is still recording, VOD once finalized.
+    """
+    asset = assets_col.find_one({"_id": asset_id}, {"kind": 1, "segments": 1, "status": 1})
+    if not asset or asset.get("kind") != "recording":
+        raise HTTPException(status_code=404, detail="Recording not found")
+
+    def presign(segment):
+        return presign_get(segment["key"])
+
+    body = render_playlist(
+        asset.get("segments", []),
+        ended=asset.get("status") != "recording",
+        uri_for=presign,
     )
+    return PlainTextResponse(body, media_type="application/vnd.apple.mpegurl")
 
-    return {"stream_url": url}
+@app.get("/assets/{asset_id}/thumbnails.vtt")
+async def thumbnails_vtt(asset_id: str):
+    """
+    Scrubbing thumbnails as WebVTT, with sprite references rewritten to
+    presigned URLs (the #xywh fragment is kept).
+    """
+    asset = assets_col.find_one({"_id": asset_id}, {"thumbnails": 1})
+    thumbnails = (asset or {}).get("thumbnails")
+    if not thumbnails:
+        raise HTTPException(status_code=404, detail="Thumbnails not found")
+
+    body = s3.get_object(Bucket=BUCKET_NAME, Key=thumbnails["vtt_key"])["Body"].read().decode()
+    prefix = thumbnails["vtt_key"].rsplit("/", 1)[0]
+
+    signed = {}
+    for name in thumbnails["sprites"]:
+        signed[name] = presign_get(f"{prefix}/{name}")
+
+    lines = []
+    for line in body.split("\n"):
+        name, sep, fragment = line.partition("#xywh=")
+        if sep and name in signed:
+            line = f"{signed[name]}#xywh={fragment}"
+        lines.append(line)
+
+    return PlainTextResponse("\n".join(lines), media_type="text/vtt")
+
+@app.get("/assets/{asset_id}/keyframes")
+async def keyframe_index(asset_id: str):
+    asset = assets_col.find_one({"_id": asset_id}, {"thumbnails": 1})
+    thumbnails = (asset or {}).get("thumbnails")
+    if not thumbnails:
+        raise HTTPException(status_code=404, detail="Keyframe index not found")
+
+    url = presign_get(thumbnails["keyframes_key"])
+    return {"keyframes_url": url, "count": thumbnails.get("keyframe_count")}
+
+@app.get("/assets/{asset_id}/scenes")
+async def scene_index(asset_id: str, format: str = "columns", offset: int = 0, limit: int | None = None):
+    """
+    Scene index from a `scenes` job. format=columns returns the stored
+    arrays as-is; format=rows returns one object per scene (paged with
+    offset/limit).
+    """
+    asset = assets_col.find_one({"_id": asset_id}, {"scene_index": 1})
+    index = (asset or {}).get("scene_index")
+    if not index:
+        raise HTTPException(status_code=404, detail="Scene index not found")
+
+    if format == "columns":
+        return index
+    if format != "rows":
+        raise HTTPException(status_code=400, detail="format must be 'columns' or 'rows'")
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="offset must be >= 0")
+    if limit is not None and limit < 1:
+        raise HTTPException(status_code=400, detail="limit must be >= 1")
+
+    stop = offset + limit if limit is not None else None
+    return {
+        "count": index["count"],
+        "duration": index["duration"],
+        "scenes": scene_rows(index, offset, stop),
+    }
 
 @app.post("/create-job", response_model=JobResponse)
 async def create_processing_job(req: CreateJobRequest):
-    job = create_job(req.asset_ids,job_type=req.job_type)
+    # Validate up front so a bad profile fails the request, not the job
+    try:
+        profile = profile_for_job(req.job_type, get_profile(req.profile))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    redis_client.lpush(JOB_QUEUE, job["job_id"])
+    if req.job_type == JobType.pipeline:
+        # Steps are queued by the scheduler as their dependencies finish
+        try:
+            job = start_pipeline((req.params or {}).get("steps") or [], profile=profile)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return {"job_id": job["job_id"], "status": "processing"}
+
+    reserved = set(req.params or {}) & set(RESERVED_PARAMS)
+    if reserved:
+        raise HTTPException(status_code=400, detail=f"params may not set {sorted(reserved)}")
+
+    job = create_job(req.asset_ids,job_type=req.job_type,params=req.params,profile=profile)
+
+    redis_client.lpush(queue_for(req.job_type), job["job_id"])
 
     return {
         "job_id": job["job_id"],
         "status": job["status"],
     }
 
+@app.get("/pipelines/{pipeline_id}")
+async def pipeline_status(pipeline_id: str):
+    """
+    Per-step status of a pipeline job. Example body for POST /create-job
+    reproducing ffmpeg/main.py (normalize both, match, merge):
+
+        {"job_type": "pipeline", "asset_ids": [], "params": {"steps": [
+            {"id": "norm_a", "job_type": "normalize", "asset_ids": ["A"]},
+            {"id": "norm_b", "job_type": "normalize", "asset_ids": ["B"]},
+            {"id": "match", "job_type": "match", "depends_on": ["norm_a", "norm_b"]},
+            {"id": "merge", "job_type": "merge", "depends_on": ["match", "norm_b"]}
+        ]}}
+    """
+    pipeline = get_pipeline(pipeline_id)
+    if not pipeline:
+        raise HTTPException(status_code=404, detail="Pipeline not found")
+    return pipeline
+
+@app.get("/profiles")
+async def api_list_profiles():
+    return {"profiles": list_profiles()}
+
+@app.put("/profiles/{name}")
+async def api_save_profile(name: str, profile: dict):
+    """
+    Create or replace an encoding profile. Missing fields fall back to the
+    default profile (1080p60, libx264 veryfast, CRF 23).
+    """
+    try:
+        return save_profile({**profile, "name": name})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/jobs")
+async def list_jobs(status: str | None = None, job_type: JobType | None = None, asset_id: str | None = None,
+                    since: datetime | None = None, until: datetime | None = None,
+                    limit: int = DEFAULT_PAGE_SIZE, cursor: str | None = None):
+    """
+    Jobs newest first. Pass next_cursor back as cursor for the next page.
+    Without asset_id the query is answered from an index alone.
+    """
+    filters = {
+        "status": status,
+        "job_type": job_type.value if job_type else None,
+        "asset_ids": asset_id,
+    }
+    try:
+        page = list_page(jobs_col, filters, ["status", "job_type"], limit, cursor, since, until)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    page["items"] = [{"job_id": doc.pop("_id"), **doc} for doc in page["items"]]
+    return page
+
+@app.get("/assets")
+async def list_assets(status: str | None = None, kind: str | None = None,
+                      since: datetime | None = None, until: datetime | None = None,
+                      limit: int = DEFAULT_PAGE_SIZE, cursor: str | None = None):
+    """Assets newest first, same paging as /jobs."""
+    try:
+        page = list_page(assets_col, {"status": status, "kind": kind}, ["status", "kind"],
+                         limit, cursor, since, until)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    page["items"] = [{"asset_id": doc.pop("_id"), **doc} for doc in page["items"]]
+    return page
+
 @app.post("/get-job-status/{job_id}",response_model=GetJobResponse)
 async def get_job_status(job_id : str):
     job = redis_client.hgetall(f"job:{job_id}")
+    if not job:
+        # Finished jobs expire from Redis after a day
+        job = jobs_col.find_one({"_id": job_id}, {"status": 1})
     if not job:
         return {"status":"no job found (unknown)"}
     return {
@@ -98,11 +319,26 @@ async def get_job_status(job_id : str):
     }
 
 @app.get("/get-analysis/{job_id}")
-async def get_job_analytics(job_id: str):
+async def get_job_analytics(job_id: str, request: Request, fields: str | None = None, full: bool = False):
+    """
+    Compact analysis of an `analyze` job (duration, size, bit_rate, format,
+    video.*, audio.*, streams.*). fields=duration,video.width,... projects
+    it; full=true returns the raw ffprobe JSON instead. Completed results
+    carry an ETag — send it back as If-None-Match to get a 304.
+    """
     job = redis_client.hgetall(f"job:{job_id}")
 
     if not job:
-        raise HTTPException(status_code=404, detail="Job not found")
+        # Expired from Redis — everything needed is in Mongo
+        doc = jobs_col.find_one({"_id": job_id}, {"status": 1, "progress": 1, "step": 1})
+        if not doc:
+            raise HTTPException(status_code=404, detail="Job not found")
+        job = {
+            "status": doc.get("status"),
+            "progress": doc.get("progress") or 0,
+            "step": doc.get("step"),
+            "outputs_in_mongo": 1,
+        }
 
     def decode(x):
         return x.decode() if isinstance(x, (bytes, bytearray)) else x
@@ -119,17 +355,47 @@ async def get_job_analytics(job_id: str):
             "step": job.get("step"),
         }
 
-    outputs = json.loads(job.get("outputs", "{}"))
-    metadata = outputs.get("metadata")
+    if full:
+        doc = jobs_col.find_one({"_id": job_id}, {"outputs.metadata": 1})
+        payload = ((doc or {}).get("outputs") or {}).get("metadata")
+    else:
+        outputs = json.loads(job.get("outputs", "{}"))
+        payload = outputs.get("analysis")
 
-    if not metadata:
+        if payload is None and job.get("outputs_in_mongo"):
+            doc = jobs_col.find_one({"_id": job_id}, {"outputs.analysis": 1})
+            payload = ((doc or {}).get("outputs") or {}).get("analysis")
+
+            if payload is None:
+                doc = jobs_col.find_one({"_id": job_id}, {"outputs.metadata": 1})
+                metadata = ((doc or {}).get("outputs") or {}).get("metadata")
+                payload = compact_metadata(metadata) if metadata else None
+
+        if payload is None and outputs.get("metadata"):
+            # Jobs finished before compact analysis existed
+            payload = compact_metadata(outputs["metadata"])
+
+    if not payload:
         raise HTTPException(status_code=404, detail="Metadata missing")
 
-    return metadata
+    if fields:
+        try:
+            payload = project(payload, [f.strip() for f in fields.split(",") if f.strip()])
+        except KeyError as e:
+            raise HTTPException(status_code=400, detail=f"Unknown field {e.args[0]}")
+
+    etag = etag_for(payload)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag in [t.strip() for t in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    return JSONResponse(payload, headers=headers)
 
 class StartStreamRequest(BaseModel):
     rtsp_url: str
     stream_id: str | None = None  # optional — auto-generated if not provided
+    profile: str | None = None    # passthrough / light / full — picked from the probe if not provided
+    output: str = "live"          # live / preview / record — shares the camera ingest with other outputs
 
 
 class StartStreamResponse(BaseModel):
@@ -137,6 +403,11 @@ class StartStreamResponse(BaseModel):
     rtmp_url: str
     hls_preview: str
     status: str
+    profile: str | None = None
+    ingest_id: str
+    output: str
+    shared_ingest: bool
+    recording_asset_id: str | None = None
 
 
 class StreamStatusResponse(BaseModel):
@@ -146,12 +417,24 @@ class StreamStatusResponse(BaseModel):
     rtmp_url: str
     hls_preview: str | None = None
     reconnect_attempt: int | None = None
+    profile: str | None = None
+    probe_cached: bool | None = None
+    time_to_first_frame_ms: int | None = None
+    ingest_id: str | None = None
+    output: str | None = None
+    recording_asset_id: str | None = None
 
 @app.post("/streams/start", response_model=StartStreamResponse)
 async def api_start_stream(req: StartStreamRequest):
     """
     Start a live RTSP → normalize → RTMP stream.
 
+    Returns immediately with status "starting"; probing and FFmpeg startup
+    run in the background. Poll /streams/{stream_id}/status until "live".
+
+    Starting the same RTSP URL again attaches another output to the
+    existing ingest instead of opening a second camera connection.
+
     The RTSP URL is the camera source (e.g. rtsp://192.168.1.50/stream1).
     The normalized stream will be published to MediaMTX at:
         rtmp://localhost:1935/live/{stream_id}
@@ -160,7 +443,7 @@ async def api_start_stream(req: StartStreamRequest):
         http://localhost:8888/{stream_id}/index.m3u8
     """
     try:
-        result = start_stream(req.rtsp_url, stream_id=req.stream_id)
+        result = start_stream(req.rtsp_url, stream_id=req.stream_id, profile=req.profile, output=req.output)
     except RuntimeError as e:
         raise HTTPException(status_code=400, detail=str(e))
     return result
@@ -194,6 +477,12 @@ async def api_stream_status(stream_id: str):
         "rtmp_url": data.get("rtmp_url", ""),
         "hls_preview": f"http://localhost:8888/{stream_id}/index.m3u8",
         "reconnect_attempt": int(data.get("reconnect_attempt", 0)),
+        "profile": data.get("profile"),
+        "probe_cached": bool(int(data["probe_cached"])) if "probe_cached" in data else None,
+        "time_to_first_frame_ms": int(data["time_to_first_frame_ms"]) if "time_to_first_frame_ms" in data else None,
+        "ingest_id": data.get("ingest_id"),
+        "output": data.get("output"),
+        "recording_asset_id": data.get("recording_asset_id") or None,
     }
 
 
@@ -202,4 +491,12 @@ async def api_list_streams():
     """
     List all currently active stream IDs.
     """
-    return {"active_streams": list_active_streams()}
\ No newline at end of file
+    return {"active_streams": list_active_streams()}
+
+
+@app.get("/streams/ingests")
+async def api_list_ingests():
+    """
+    List camera ingests and the outputs attached to each.
+    """
+    return {"ingests": list_ingests()}
@@ -0,0 +1,95 @@
+import hashlib
+import json
+
+from ffmpeg.utils.ffmpeg import parse_rate
+
+# Outputs bigger than this stay in Mongo only; the Redis hash is polled
+# constantly and every byte there is parsed on each poll
+REDIS_OUTPUT_LIMIT = 16 * 1024
+
+
+def _number(value, cast=float):
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _stream_summary(stream: dict) -> dict:
+    if stream.get("codec_type") == "video":
+        return {
+            "codec": stream.get("codec_name"),
+            "profile": stream.get("profile"),
+            "width": _number(stream.get("width"), int),
+            "height": _number(stream.get("height"), int),
+            "fps": round(parse_rate(stream.get("avg_frame_rate") or stream.get("r_frame_rate")), 3) or None,
+            "pix_fmt": stream.get("pix_fmt"),
+            "bit_rate": _number(stream.get("bit_rate"), int),
+        }
+    return {
+        "codec": stream.get("codec_name"),
+        "sample_rate": _number(stream.get("sample_rate"), int),
+        "channels": _number(stream.get("channels"), int),
+        "channel_layout": stream.get("channel_layout"),
+        "bit_rate": _number(stream.get("bit_rate"), int),
+    }
+
+
+def compact_metadata(metadata: dict) -> dict:
+    """
+    Flatten raw ffprobe JSON into the small fixed schema served by
+    /get-analysis: container fields, the first video and audio stream,
+    and per-type stream counts.
+    """
+    fmt = metadata.get("format", {})
+    streams = metadata.get("streams", [])
+
+    counts = {}
+    first = {}
+    for stream in streams:
+        kind = stream.get("codec_type", "unknown")
+        counts[kind] = counts.get(kind, 0) + 1
+        if kind in ("video", "audio") and kind not in first:
+            first[kind] = _stream_summary(stream)
+
+    return {
+        "duration": _number(fmt.get("duration")),
+        "size": _number(fmt.get("size"), int),
+        "bit_rate": _number(fmt.get("bit_rate"), int),
+        "format": fmt.get("format_name"),
+        "video": first.get("video"),
+        "audio": first.get("audio"),
+        "streams": counts,
+    }
+
+
+def project(doc: dict, fields: list[str]) -> dict:
+    """
+    Keep only the dotted paths in fields (e.g. ["duration", "video.width"]).
+    Paths under a missing stream come back as None; raises KeyError
+    naming the first path that is not part of the schema.
+    """
+    result = {}
+    for path in fields:
+        parts = path.split(".")
+
+        value = doc
+        for part in parts:
+            if value is None:
+                # e.g. video.width on an audio-only file
+                break
+            if not isinstance(value, dict) or part not in value:
+                raise KeyError(path)
+            value = value[part]
+
+        target = result
+        for part in parts[:-1]:
+            target = target.setdefault(part, {})
+        target[parts[-1]] = value
+
+    return result
+
+
+def etag_for(payload) -> str:
+    body = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return '"' + hashlib.sha1(body.encode()).hexdigest() + '"'
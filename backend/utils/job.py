@@ -2,7 +2,7 @@ from enum import Enum
 from uuid import uuid4
 from typing import Dict
 import json
-from backend.utils.redis_client import redis_client
+from backend.utils.redis_client import redis_client, JOB_QUEUE, PREVIEW_QUEUE
 from backend.utils.mongo import jobs_col
 from datetime import datetime, timezone
 
@@ -17,8 +17,17 @@ class JobType(str, Enum):
     analyze = "analyze"
     merge = "merge"
     livestream = "livestream" 
+    thumbnails = "thumbnails"
+    scenes = "scenes"
+    match = "match"         # broadcast-match asset_ids[0] to asset_ids[1]
+    preview = "preview"     # fast low-res proxy, runs on PREVIEW_QUEUE
+    pipeline = "pipeline"   # DAG of the above, see utils/pipeline.py
 
-def create_job(asset_ids: list[str], job_type: JobType, params: dict | None = None) -> dict:
+def queue_for(job_type: JobType) -> str:
+    return PREVIEW_QUEUE if job_type == JobType.preview else JOB_QUEUE
+
+def create_job(asset_ids: list[str], job_type: JobType, params: dict | None = None,
+               profile: dict | None = None) -> dict:
     job_id = str(uuid4())
     now = datetime.now(timezone.utc)
 
@@ -26,6 +35,9 @@ def create_job(asset_ids: list[str], job_type: JobType, params: dict | None = No
         "job_id": job_id,
         "job_type": job_type.value,
         "asset_ids": asset_ids,
+        "params": params or {},
+        # Snapshot of the validated encoding profile — later edits don't affect queued jobs
+        "profile": profile,
         "status": JobStatus.queued.value,
         "step": None,
         "progress": 0,
@@ -39,6 +51,8 @@ def create_job(asset_ids: list[str], job_type: JobType, params: dict | None = No
         "job_id": job_id,
         "job_type": job_type.value,
         "asset_ids": json.dumps(asset_ids),
+        "params": json.dumps(params or {}),
+        "profile": json.dumps(profile),
         "status": JobStatus.queued.value,
         "progress": 0,
     })
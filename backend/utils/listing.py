@@ -0,0 +1,66 @@
+import base64
+import json
+from datetime import datetime
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(doc: dict) -> str:
+    payload = json.dumps({"t": doc["created_at"].isoformat(), "id": doc["_id"]})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    """Raises ValueError for anything that is not one of our cursors."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(payload["t"]), payload["id"]
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def list_page(col, filters: dict, fields: list[str], limit: int = DEFAULT_PAGE_SIZE,
+              cursor: str | None = None, since: datetime | None = None,
+              until: datetime | None = None) -> dict:
+    """
+    One page of col, newest first, using keyset pagination on
+    (created_at, _id) — every page costs the same index range scan no
+    matter how deep it is, unlike skip/limit. fields should stay within
+    the listing indexes in mongo.INDEXES so the query is covered.
+    """
+    query = {k: v for k, v in filters.items() if v is not None}
+
+    created = {}
+    if since:
+        created["$gte"] = since
+    if until:
+        created["$lt"] = until
+    if created:
+        query["created_at"] = created
+
+    if cursor:
+        last_created, last_id = decode_cursor(cursor)
+        query = {"$and": [query, {"$or": [
+            {"created_at": {"$lt": last_created}},
+            {"created_at": last_created, "_id": {"$lt": last_id}},
+        ]}]}
+
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    projection = {field: 1 for field in ("created_at", *fields)}
+
+    # One extra row tells us whether there is a next page without a count()
+    docs = list(
+        col.find(query, projection)
+        .sort([("created_at", -1), ("_id", -1)])
+        .limit(limit + 1)
+    )
+
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+
+    return {
+        "items": docs,
+        "next_cursor": encode_cursor(docs[-1]) if has_more else None,
+    }
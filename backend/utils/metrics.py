@@ -0,0 +1,142 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Minimal Prometheus text-format registry shared by the API and the worker.
+# Each process exports its own samples: the API via GET /metrics, the
+# worker via start_metrics_server().
+
+WORKER_METRICS_PORT = 9101
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_LOCK = threading.Lock()
+_META: dict[str, tuple[str, str]] = {}         # name -> (type, help)
+_COUNTERS: dict[tuple, float] = {}             # (name, labels) -> value
+_GAUGES: dict[tuple, float] = {}
+_HISTOGRAMS: dict[tuple, dict] = {}            # (name, labels) -> {"buckets", "sum", "count"}
+
+
+def describe(name: str, metric_type: str, help_text: str):
+    _META[name] = (metric_type, help_text)
+
+
+def _labels_key(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def inc(name: str, value: float = 1, **labels):
+    key = (name, _labels_key(labels))
+    with _LOCK:
+        _COUNTERS[key] = _COUNTERS.get(key, 0) + value
+
+
+def set_gauge(name: str, value: float, **labels):
+    with _LOCK:
+        _GAUGES[(name, _labels_key(labels))] = value
+
+
+def observe(name: str, value: float, **labels):
+    key = (name, _labels_key(labels))
+    with _LOCK:
+        hist = _HISTOGRAMS.setdefault(key, {
+            "buckets": [0] * len(DEFAULT_BUCKETS),
+            "sum": 0.0,
+            "count": 0,
+        })
+        for i, bound in enumerate(DEFAULT_BUCKETS):
+            if value <= bound:
+                hist["buckets"][i] += 1
+        hist["sum"] += value
+        hist["count"] += 1
+
+
+def _format_labels(labels: tuple, extra: tuple = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    body = ",".join(f'{k}="{v}"' for k, v in pairs)
+    return "{" + body + "}"
+
+
+def render() -> str:
+    lines = []
+    with _LOCK:
+        for name, (metric_type, help_text) in sorted(_META.items()):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+
+            if metric_type == "counter":
+                for (n, labels), value in _COUNTERS.items():
+                    if n == name:
+                        lines.append(f"{name}{_format_labels(labels)} {value}")
+
+            elif metric_type == "gauge":
+                for (n, labels), value in _GAUGES.items():
+                    if n == name:
+                        lines.append(f"{name}{_format_labels(labels)} {value}")
+
+            elif metric_type == "histogram":
+                for (n, labels), hist in _HISTOGRAMS.items():
+                    if n != name:
+                        continue
+                    for bound, count in zip(DEFAULT_BUCKETS, hist["buckets"]):
+                        lines.append(f"{name}_bucket{_format_labels(labels, (('le', str(bound)),))} {count}")
+                    lines.append(f"{name}_bucket{_format_labels(labels, (('le', '+Inf'),))} {hist['count']}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {hist['sum']}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {hist['count']}")
+
+    return "\n".join(lines) + "\n"
+
+
+# -------------------------------------------------
+# Job metrics (recorded by the worker)
+# -------------------------------------------------
+
+describe("vdo_jobs_total", "counter", "Jobs finished by type and final status")
+describe("vdo_job_stage_seconds", "histogram", "Wall time per worker stage")
+describe("vdo_job_stage_cpu_seconds_total", "counter", "Worker CPU time per stage (excluding ffmpeg children)")
+describe("vdo_subprocess_cpu_seconds_total", "counter", "CPU time of ffmpeg/ffprobe children")
+describe("vdo_subprocess_io_bytes_total", "counter", "Bytes read/written by ffmpeg/ffprobe children")
+describe("vdo_subprocess_max_rss_bytes", "gauge", "Max RSS of the most recent ffmpeg/ffprobe child")
+describe("vdo_encode_speed", "gauge", "Realtime speed reported by the most recent ffmpeg run")
+describe("vdo_frames_saved_total", "counter", "Frames not encoded thanks to the frame-rate policy")
+
+
+def record_job(job_type: str, status: str, spans: list[dict]):
+    inc("vdo_jobs_total", job_type=job_type, status=status)
+
+    for s in spans:
+        if "max_rss_bytes" in s:
+            tool = s["name"]
+            inc("vdo_subprocess_cpu_seconds_total", s["cpu_s"], job_type=job_type, tool=tool)
+            if s.get("read_bytes") is not None:
+                inc("vdo_subprocess_io_bytes_total", s["read_bytes"], job_type=job_type, tool=tool, direction="read")
+                inc("vdo_subprocess_io_bytes_total", s["write_bytes"], job_type=job_type, tool=tool, direction="write")
+            set_gauge("vdo_subprocess_max_rss_bytes", s["max_rss_bytes"], job_type=job_type, tool=tool)
+            if "speed" in s:
+                set_gauge("vdo_encode_speed", s["speed"], job_type=job_type)
+        else:
+            observe("vdo_job_stage_seconds", s["wall_s"], job_type=job_type, stage=s["name"])
+            inc("vdo_job_stage_cpu_seconds_total", s["cpu_s"], job_type=job_type, stage=s["name"])
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # scrapes every few seconds would flood the worker log
+
+
+def start_metrics_server(port: int = WORKER_METRICS_PORT) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -1,11 +1,108 @@
-import boto3
+import threading
+import time
 
-s3 = boto3.client(
-    "s3",
-    endpoint_url="http://localhost:9000",
-    aws_access_key_id="minioadmin",
-    aws_secret_access_key="minioadmin",
-    region_name="us-east-1",
-)
+from backend.utils.clients import LazyProxy, cached_client, setting
 
-BUCKET_NAME = "media"
\ No newline at end of file
+BUCKET_NAME = setting("S3_BUCKET", "media")
+
+# Transfer tuning. Each upload/download uses up to S3_MAX_CONCURRENCY
+# threads, and the connection pool is sized so WORKER_CONCURRENCY
+# transfers at once never wait on a connection (botocore's default
+# pool of 10 does).
+S3_MULTIPART_THRESHOLD = int(setting("S3_MULTIPART_THRESHOLD_MB", "16")) * 1024 ** 2
+S3_MULTIPART_CHUNKSIZE = int(setting("S3_MULTIPART_CHUNKSIZE_MB", "16")) * 1024 ** 2
+S3_MAX_CONCURRENCY = int(setting("S3_MAX_CONCURRENCY", "8"))
+WORKER_CONCURRENCY = int(setting("WORKER_CONCURRENCY", "1"))
+# + headroom for head/put/get calls made alongside transfers
+S3_MAX_POOL_CONNECTIONS = int(setting(
+    "S3_MAX_POOL_CONNECTIONS", str(max(10, S3_MAX_CONCURRENCY * WORKER_CONCURRENCY + 4))
+))
+
+PRESIGN_EXPIRES = 3600
+# Cached URLs are reused only while they have this much life left, so a
+# long FFmpeg read never starts on a nearly expired link
+PRESIGN_MIN_REMAINING = 45 * 60
+
+_PRESIGN_LOCK = threading.Lock()
+_PRESIGNED: dict[tuple, tuple[str, float]] = {}
+
+
+def get_s3():
+    def build():
+        import boto3
+        from botocore.config import Config
+
+        # Own session — the default one is not safe to create clients from
+        # concurrently; the client itself is thread-safe and shared
+        session = boto3.session.Session()
+        return session.client(
+            "s3",
+            endpoint_url=setting("S3_ENDPOINT_URL", "http://localhost:9000"),
+            aws_access_key_id=setting("S3_ACCESS_KEY", "minioadmin"),
+            aws_secret_access_key=setting("S3_SECRET_KEY", "minioadmin"),
+            region_name=setting("S3_REGION", "us-east-1"),
+            config=Config(
+                max_pool_connections=S3_MAX_POOL_CONNECTIONS,
+                tcp_keepalive=True,
+                retries={"max_attempts": 5, "mode": "adaptive"},
+            ),
+        )
+    return cached_client("s3", build)
+
+
+s3 = LazyProxy(get_s3)
+
+
+def transfer_config():
+    def build():
+        from boto3.s3.transfer import TransferConfig
+        return TransferConfig(
+            multipart_threshold=S3_MULTIPART_THRESHOLD,
+            multipart_chunksize=S3_MULTIPART_CHUNKSIZE,
+            max_concurrency=S3_MAX_CONCURRENCY,
+            use_threads=S3_MAX_CONCURRENCY > 1,
+        )
+    return cached_client("s3_transfer_config", build)
+
+
+def upload_file(path, key: str, content_type: str | None = None):
+    extra = {"ContentType": content_type} if content_type else None
+    s3.upload_file(str(path), BUCKET_NAME, key, ExtraArgs=extra, Config=transfer_config())
+
+
+def download_file(key: str, path):
+    s3.download_file(BUCKET_NAME, key, str(path), Config=transfer_config())
+
+
+def presign_get(key: str, expires: int = PRESIGN_EXPIRES) -> str:
+    """
+    Presigned GET URL, reused from a small in-process cache while it
+    stays valid for PRESIGN_MIN_REMAINING — pipeline steps and the
+    thumbnails endpoint sign the same keys over and over.
+    """
+    cache_key = (key, expires)
+    now = time.time()
+
+    with _PRESIGN_LOCK:
+        cached = _PRESIGNED.get(cache_key)
+    # Short-lived URLs can't keep 45 min of life; reuse those for half their span
+    min_remaining = PRESIGN_MIN_REMAINING if PRESIGN_MIN_REMAINING < expires else expires / 2
+    if cached and cached[1] - now >= min_remaining:
+        return cached[0]
+
+    url = s3.generate_presigned_url(
+        "get_object",
+        Params={"Bucket": BUCKET_NAME, "Key": key},
+        ExpiresIn=expires,
+    )
+
+    with _PRESIGN_LOCK:
+        if len(_PRESIGNED) > 10_000:
+            # Drop everything expired-ish rather than tracking LRU order
+            for k in [k for k, (_, exp) in _PRESIGNED.items() if exp - now < PRESIGN_MIN_REMAINING]:
+                del _PRESIGNED[k]
+            if len(_PRESIGNED) > 10_000:
+                _PRESIGNED.clear()
+        _PRESIGNED[cache_key] = (url, now + expires)
+
+    return url
@@ -0,0 +1,229 @@
+import json
+import re
+
+from backend.utils.redis_client import redis_client
+from backend.utils.job import create_job, queue_for, JobStatus, JobType
+from backend.utils.mongo import jobs_col
+from backend.utils.profiles import profile_for_job
+from backend.utils.retention import expire_job, FINISHED_JOB_TTL
+
+# Job types a pipeline step can run. Steps that produce a media file
+# report it as outputs["output_key"]; dependents receive those keys as
+# their inputs instead of the raw uploads.
+STEP_TYPES = {
+    JobType.analyze,
+    JobType.normalize,
+    JobType.match,
+    JobType.merge,
+    JobType.thumbnails,
+    JobType.scenes,
+    JobType.preview,
+}
+MAX_STEPS = 32
+# Set on step jobs by _dispatch only; a client passing them could steer
+# another pipeline or read arbitrary bucket keys
+RESERVED_PARAMS = ("pipeline", "input_keys")
+# Step ids become Mongo field paths (steps.<id>) and Redis hash fields,
+# so no dots, dollars or separators
+STEP_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+def _pipeline_key(pipeline_id: str) -> str:
+    return f"pipeline:{pipeline_id}"
+
+
+def validate_steps(steps: list[dict]) -> list[dict]:
+    """
+    Normalize and check a step list: unique ids, known job types, known
+    dependencies, no cycles. Returns the steps in dependency order;
+    raises ValueError on the first problem.
+    """
+    if not steps:
+        raise ValueError("A pipeline needs at least one step")
+    if len(steps) > MAX_STEPS:
+        raise ValueError(f"A pipeline can have at most {MAX_STEPS} steps")
+
+    normalized = {}
+    for step in steps:
+        step_id = step.get("id")
+        if not isinstance(step_id, str) or not step_id:
+            raise ValueError("Every step needs a string id")
+        if not STEP_ID_PATTERN.match(step_id):
+            raise ValueError(f"Step id '{step_id}' may only contain letters, digits, '_' and '-' (max 64)")
+        if step_id in normalized:
+            raise ValueError(f"Duplicate step id '{step_id}'")
+
+        try:
+            job_type = JobType(step.get("job_type"))
+        except ValueError:
+            job_type = None
+        if job_type not in STEP_TYPES:
+            raise ValueError(f"Step '{step_id}': job_type must be one of {sorted(t.value for t in STEP_TYPES)}")
+
+        reserved = set(step.get("params") or {}) & set(RESERVED_PARAMS)
+        if reserved:
+            raise ValueError(f"Step '{step_id}': params may not set {sorted(reserved)}")
+
+        normalized[step_id] = {
+            "id": step_id,
+            "job_type": job_type.value,
+            "asset_ids": list(step.get("asset_ids") or []),
+            "depends_on": list(step.get("depends_on") or []),
+            "params": dict(step.get("params") or {}),
+        }
+
+    for step in normalized.values():
+        for dep in step["depends_on"]:
+            if dep not in normalized:
+                raise ValueError(f"Step '{step['id']}' depends on unknown step '{dep}'")
+        if not step["asset_ids"] and not step["depends_on"]:
+            raise ValueError(f"Step '{step['id']}' has neither asset_ids nor depends_on")
+
+    # Kahn's algorithm — anything left over is on a cycle
+    waiting = {sid: len(step["depends_on"]) for sid, step in normalized.items()}
+    ready = [sid for sid, n in waiting.items() if n == 0]
+    ordered = []
+    while ready:
+        sid = ready.pop(0)
+        ordered.append(normalized[sid])
+        for other in normalized.values():
+            if sid in other["depends_on"]:
+                waiting[other["id"]] -= other["depends_on"].count(sid)
+                if waiting[other["id"]] == 0:
+                    ready.append(other["id"])
+
+    if len(ordered) != len(normalized):
+        raise ValueError("Pipeline steps contain a cycle")
+
+    return ordered
+
+
+def start_pipeline(steps: list[dict], profile: dict | None = None) -> dict:
+    """
+    Create the parent pipeline job and queue every step without
+    dependencies. The rest are queued by workers as their dependencies
+    complete (see advance_pipeline).
+    """
+    steps = validate_steps(steps)
+
+    asset_ids = sorted({a for step in steps for a in step["asset_ids"]})
+    job = create_job(asset_ids, JobType.pipeline, params={"steps": steps}, profile=profile)
+    pipeline_id = job["job_id"]
+
+    fields = {"steps": json.dumps(steps), "profile": json.dumps(profile), "done": 0}
+    for step in steps:
+        fields[f"wait:{step['id']}"] = len(step["depends_on"])
+    redis_client.hset(_pipeline_key(pipeline_id), mapping=fields)
+
+    redis_client.hset(f"job:{pipeline_id}", mapping={"status": JobStatus.processing.value, "step": "running"})
+    jobs_col.update_one({"_id": pipeline_id}, {"$set": {"status": JobStatus.processing.value}})
+
+    for step in steps:
+        if not step["depends_on"]:
+            _dispatch(pipeline_id, step, profile, [])
+
+    return job
+
+
+def _dispatch(pipeline_id: str, step: dict, profile: dict | None, upstream: list[dict]):
+    input_keys = [out["output_key"] for out in upstream if out.get("output_key")]
+    asset_ids = step["asset_ids"] or sorted({a for out in upstream for a in out.get("asset_ids", [])})
+
+    params = {
+        **step["params"],
+        "pipeline": {"id": pipeline_id, "step": step["id"]},
+        "input_keys": input_keys,
+    }
+    job = create_job(asset_ids, JobType(step["job_type"]), params=params,
+                     profile=profile_for_job(step["job_type"], profile))
+
+    redis_client.hset(_pipeline_key(pipeline_id), f"job:{step['id']}", job["job_id"])
+    jobs_col.update_one({"_id": pipeline_id}, {"$set": {f"steps.{step['id']}": job["job_id"]}})
+    redis_client.lpush(queue_for(JobType(step["job_type"])), job["job_id"])
+    print(f"[pipeline] {pipeline_id}: dispatched {step['id']} ({step['job_type']}) as {job['job_id']}")
+
+
+def _step_outputs(pipeline_id: str, step_id: str) -> dict:
+    job_id = redis_client.hget(_pipeline_key(pipeline_id), f"job:{step_id}")
+    doc = jobs_col.find_one({"_id": job_id}, {"outputs": 1, "asset_ids": 1}) or {}
+    return {**(doc.get("outputs") or {}), "asset_ids": doc.get("asset_ids", [])}
+
+
+def _finish_pipeline(pipeline_id: str, status: str, fields: dict):
+    job_key = f"job:{pipeline_id}"
+    redis_client.hset(job_key, mapping={
+        "status": status,
+        "progress": 100,
+        "step": "complete" if status == JobStatus.completed.value else "failed",
+        **{k: json.dumps(v) if isinstance(v, dict) else v for k, v in fields.items()},
+    })
+    jobs_col.update_one({"_id": pipeline_id}, {"$set": {"status": status, "progress": 100, **fields}})
+    expire_job(job_key)
+    redis_client.expire(_pipeline_key(pipeline_id), FINISHED_JOB_TTL)
+
+
+def advance_pipeline(pipeline_id: str, step_id: str, status: str, error: str | None = None):
+    """
+    Called by the worker when a step job finishes. Releases dependents
+    whose last dependency this was; the HINCRBY on their wait counter
+    makes sure exactly one worker queues each of them.
+    """
+    key = _pipeline_key(pipeline_id)
+    state = redis_client.hget(key, "steps")
+    if not state or redis_client.hget(key, "failed"):
+        return
+
+    if status != JobStatus.completed.value:
+        # First failure wins; dependents are never queued
+        if redis_client.hsetnx(key, "failed", step_id):
+            _finish_pipeline(pipeline_id, JobStatus.failed.value, {"error": f"Step '{step_id}' failed: {error}"})
+        return
+
+    steps = json.loads(state)
+    profile = json.loads(redis_client.hget(key, "profile") or "null")
+
+    for step in steps:
+        if step_id not in step["depends_on"]:
+            continue
+        remaining = redis_client.hincrby(key, f"wait:{step['id']}", -step["depends_on"].count(step_id))
+        if remaining == 0:
+            upstream = [_step_outputs(pipeline_id, dep) for dep in step["depends_on"]]
+            _dispatch(pipeline_id, step, profile, upstream)
+
+    done = redis_client.hincrby(key, "done", 1)
+    redis_client.hset(f"job:{pipeline_id}", "progress", int(done * 100 / len(steps)))
+
+    if done == len(steps):
+        outputs = {step["id"]: _step_outputs(pipeline_id, step["id"]) for step in steps}
+        _finish_pipeline(pipeline_id, JobStatus.completed.value, {"outputs": outputs})
+
+
+def get_pipeline(pipeline_id: str) -> dict | None:
+    doc = jobs_col.find_one({"_id": pipeline_id, "job_type": JobType.pipeline.value})
+    if not doc:
+        return None
+
+    step_jobs = doc.get("steps") or {}
+    statuses = {}
+    for job in jobs_col.find({"_id": {"$in": list(step_jobs.values())}}, {"status": 1, "outputs": 1, "error": 1}):
+        statuses[job["_id"]] = job
+
+    steps = []
+    for step in doc["params"]["steps"]:
+        job_id = step_jobs.get(step["id"])
+        job = statuses.get(job_id, {})
+        steps.append({
+            "id": step["id"],
+            "job_type": step["job_type"],
+            "depends_on": step["depends_on"],
+            "job_id": job_id,
+            "status": job.get("status", "waiting"),
+            "outputs": job.get("outputs"),
+        })
+
+    return {
+        "pipeline_id": pipeline_id,
+        "status": doc.get("status"),
+        "error": doc.get("error"),
+        "steps": steps,
+    }
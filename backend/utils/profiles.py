@@ -0,0 +1,55 @@
+from datetime import datetime, timezone
+
+from backend.utils.mongo import profiles_col
+from ffmpeg.profiles import BUILTIN_PROFILES, validate_profile
+
+
+def get_profile(name: str) -> dict:
+    """
+    Resolve a profile by name: Mongo first (operators can override the
+    builtins), then the builtin set. Raises ValueError if unknown.
+    """
+    doc = profiles_col.find_one({"_id": name})
+    if doc:
+        doc.pop("created_at", None)
+        doc.pop("updated_at", None)
+        return validate_profile(doc)
+
+    if name in BUILTIN_PROFILES:
+        return dict(BUILTIN_PROFILES[name])
+
+    raise ValueError(f"Unknown encoding profile '{name}'")
+
+
+def profile_for_job(job_type: str, profile: dict | None) -> dict | None:
+    """
+    Preview jobs asked to use the default profile get the preview one —
+    a proxy at 1080p60 would defeat the point. Resolved when the job is
+    created so its profile snapshot is what the worker actually runs.
+    """
+    if job_type == "preview" and (profile is None or profile.get("name") == "default"):
+        return get_profile("preview")
+    return profile
+
+
+def save_profile(profile: dict) -> dict:
+    profile = validate_profile(profile)
+    now = datetime.now(timezone.utc)
+
+    profiles_col.update_one(
+        {"_id": profile["name"]},
+        {
+            "$set": {**profile, "updated_at": now},
+            "$setOnInsert": {"created_at": now},
+        },
+        upsert=True,
+    )
+    return profile
+
+
+def list_profiles() -> list[dict]:
+    profiles = {name: {**p, "builtin": True} for name, p in BUILTIN_PROFILES.items()}
+    for doc in profiles_col.find({}, {"created_at": 0, "updated_at": 0}):
+        doc.pop("_id", None)
+        profiles[doc["name"]] = {**doc, "builtin": False}
+    return list(profiles.values())
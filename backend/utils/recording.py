@@ -0,0 +1,249 @@
+import csv
+import math
+import shutil
+import threading
+from pathlib import Path
+from datetime import datetime, timezone
+from uuid import uuid4
+
+from backend.utils.minio import s3, BUCKET_NAME, upload_file
+from backend.utils.mongo import assets_col
+
+RECORDINGS_DIR = Path("recordings")
+RECORD_SEGMENT_SECONDS = 6
+# Finished segments waiting for upload before the oldest are dropped —
+# keeps local disk bounded if MinIO is unreachable
+RECORD_MAX_PENDING_SEGMENTS = 5
+UPLOAD_POLL_INTERVAL = 2  # seconds
+
+# One list per FFmpeg spawn — a respawn would otherwise truncate entries
+# the uploader has not seen yet
+SEGMENT_LIST_GLOB = "segments_*.csv"
+
+
+def _segment_key(asset_id: str, name: str) -> str:
+    return f"recordings/{asset_id}/{name}"
+
+
+def playlist_key(asset_id: str) -> str:
+    return f"recordings/{asset_id}/index.m3u8"
+
+
+def create_recording_asset(stream_id: str, rtsp_url: str) -> dict:
+    """
+    Register the recording as an asset up front so it is visible (and
+    playable as an EVENT playlist) while the camera is still live.
+    """
+    asset_id = str(uuid4())
+    rec_dir = RECORDINGS_DIR / asset_id
+    rec_dir.mkdir(parents=True, exist_ok=True)
+
+    assets_col.insert_one({
+        "_id": asset_id,
+        "kind": "recording",
+        "stream_id": stream_id,
+        "rtsp_url": rtsp_url,
+        "raw_key": None,
+        "normalized_key": None,
+        "playlist_key": playlist_key(asset_id),
+        "segments": [],
+        "duration": 0.0,
+        "status": "recording",
+        "created_at": datetime.now(timezone.utc),
+    })
+
+    return {
+        "asset_id": asset_id,
+        "dir": rec_dir,
+        "next_segment": 0,
+        "discontinuity_at": set(),
+        "uploaded": set(),
+        "segments": [],
+    }
+
+
+def build_record_command(source_url: str, recording: dict) -> list[str]:
+    """
+    Stream-copy the normalized ingest into fixed-duration MPEG-TS segments.
+
+    The ingest is already H.264/AAC at the target profile, so segments are
+    HLS-playable as-is — no post-processing encode. The CSV segment list
+    only gains a line once a segment is closed, which is what the uploader
+    keys off.
+    """
+    rec_dir = recording["dir"]
+    listed = [_index_of(name) for name, _, _ in _read_segment_list(rec_dir)]
+    start_number = max([recording["next_segment"], *(i + 1 for i in listed)])
+    if start_number:
+        # Restart after a reconnect — timestamps jump, flag it in the playlist
+        recording["discontinuity_at"].add(start_number)
+
+    return [
+        "ffmpeg", "-y", "-nostats", "-progress", "pipe:1",
+        "-rtsp_transport", "tcp",
+        "-i", source_url,
+        "-map", "0",
+        "-c", "copy",
+        "-f", "segment",
+        "-segment_time", str(RECORD_SEGMENT_SECONDS),
+        "-segment_format", "mpegts",
+        "-segment_start_number", str(start_number),
+        "-segment_list", str(rec_dir / f"segments_{start_number:05d}.csv"),
+        "-segment_list_type", "csv",
+        str(rec_dir / "seg_%05d.ts"),
+    ]
+
+
+def render_playlist(segments: list[dict], ended: bool, uri_for=None) -> str:
+    """
+    Build an HLS media playlist. uri_for maps a segment to its URI
+    (defaults to the bare file name, relative to the playlist).
+    """
+    uri_for = uri_for or (lambda seg: seg["name"])
+    target = max((math.ceil(seg["duration"]) for seg in segments), default=RECORD_SEGMENT_SECONDS)
+
+    lines = [
+        "#EXTM3U",
+        "#EXT-X-VERSION:3",
+        f"#EXT-X-TARGETDURATION:{target}",
+        "#EXT-X-MEDIA-SEQUENCE:0",
+        f"#EXT-X-PLAYLIST-TYPE:{'VOD' if ended else 'EVENT'}",
+    ]
+    for seg in segments:
+        if seg.get("discontinuity"):
+            lines.append("#EXT-X-DISCONTINUITY")
+        lines.append(f"#EXTINF:{seg['duration']:.3f},")
+        lines.append(uri_for(seg))
+    if ended:
+        lines.append("#EXT-X-ENDLIST")
+
+    return "\n".join(lines) + "\n"
+
+
+def _read_segment_list(rec_dir: Path) -> list[tuple[str, float, float]]:
+    entries = []
+    for list_path in sorted(rec_dir.glob(SEGMENT_LIST_GLOB)):
+        with open(list_path, newline="") as f:
+            for row in csv.reader(f):
+                if len(row) < 3:
+                    continue
+                try:
+                    entries.append((row[0], float(row[1]), float(row[2])))
+                except ValueError:
+                    continue
+    return entries
+
+
+def _index_of(name: str) -> int:
+    return int(Path(name).stem.split("_")[-1])
+
+
+def _upload_playlist(recording: dict, ended: bool):
+    body = render_playlist(recording["segments"], ended)
+    s3.put_object(
+        Bucket=BUCKET_NAME,
+        Key=playlist_key(recording["asset_id"]),
+        Body=body.encode(),
+        ContentType="application/vnd.apple.mpegurl",
+    )
+
+
+def _sync_segments(recording: dict):
+    """Upload every closed segment not yet in MinIO, then drop it locally."""
+    rec_dir = recording["dir"]
+    asset_id = recording["asset_id"]
+
+    pending = [e for e in _read_segment_list(rec_dir) if e[0] not in recording["uploaded"]]
+
+    if len(pending) > RECORD_MAX_PENDING_SEGMENTS:
+        dropped = pending[:-RECORD_MAX_PENDING_SEGMENTS]
+        pending = pending[-RECORD_MAX_PENDING_SEGMENTS:]
+        print(f"[recording] {asset_id}: upload backlog, dropping {len(dropped)} segment(s)")
+        for name, _, _ in dropped:
+            recording["uploaded"].add(name)
+            (rec_dir / name).unlink(missing_ok=True)
+        # Whatever comes next no longer follows on from the last uploaded segment
+        recording["discontinuity_at"].add(_index_of(pending[0][0]))
+
+    for name, start, end in pending:
+        local_path = rec_dir / name
+        if not local_path.exists():
+            recording["uploaded"].add(name)
+            continue
+
+        key = _segment_key(asset_id, name)
+        upload_file(local_path, key, content_type="video/mp2t")
+
+        index = _index_of(name)
+        segment = {
+            "name": name,
+            "key": key,
+            "index": index,
+            "start": start,
+            "duration": round(end - start, 3),
+            "discontinuity": index in recording["discontinuity_at"],
+        }
+        recording["segments"].append(segment)
+        recording["uploaded"].add(name)
+        recording["next_segment"] = max(recording["next_segment"], index + 1)
+        local_path.unlink(missing_ok=True)
+
+        assets_col.update_one(
+            {"_id": asset_id},
+            {
+                "$push": {"segments": segment},
+                "$inc": {"duration": segment["duration"]},
+            }
+        )
+
+    if pending:
+        _upload_playlist(recording, ended=False)
+
+
+def run_uploader(recording: dict, entry: dict):
+    """
+    Background loop for a record output: push finished segments to MinIO
+    until the output stops, then flush the last segment and finalize the
+    asset as a VOD playlist.
+    """
+    asset_id = recording["asset_id"]
+    stop_event: threading.Event = entry["stop_event"]
+
+    while not stop_event.wait(UPLOAD_POLL_INTERVAL):
+        try:
+            _sync_segments(recording)
+        except Exception as e:
+            # MinIO hiccup — segments stay on disk and are retried next poll
+            print(f"[recording] {asset_id}: upload failed: {e}")
+
+    # FFmpeg closes (and lists) the final segment on exit
+    proc = entry.get("process")
+    if proc is not None:
+        try:
+            proc.wait(timeout=15)
+        except Exception:
+            pass
+
+    try:
+        _sync_segments(recording)
+        if recording["segments"]:
+            _upload_playlist(recording, ended=True)
+        status = "ready" if recording["segments"] else "empty"
+    except Exception as e:
+        print(f"[recording] {asset_id}: final upload failed: {e}")
+        status = "incomplete"
+
+    assets_col.update_one(
+        {"_id": asset_id},
+        {"$set": {"status": status, "updated_at": datetime.now(timezone.utc)}}
+    )
+
+    # Anything left is a partial segment from a crashed FFmpeg
+    shutil.rmtree(recording["dir"], ignore_errors=True)
+    print(f"[recording] {asset_id}: finalized ({status}, {len(recording['segments'])} segments)")
+
+
+def start_uploader(recording: dict, entry: dict) -> threading.Thread:
+    thread = threading.Thread(target=run_uploader, args=(recording, entry), daemon=True)
+    thread.start()
+    return thread
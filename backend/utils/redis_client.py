@@ -1,9 +1,7 @@
-import redis
+from backend.utils.clients import LazyProxy, get_redis
 
-redis_client = redis.Redis(
-    host="localhost",
-    port=6379,
-    decode_responses=True
-)
+redis_client = LazyProxy(get_redis)
 
-JOB_QUEUE = "media_jobs"
\ No newline at end of file
+JOB_QUEUE = "media_jobs"
+# High-priority lane: workers always drain it before JOB_QUEUE
+PREVIEW_QUEUE = "media_jobs:preview"
@@ -0,0 +1,137 @@
+import json
+import threading
+
+from backend.utils.redis_client import redis_client
+from backend.utils.analysis import compact_metadata, REDIS_OUTPUT_LIMIT
+from backend.utils import metrics
+
+# Redis only holds hot state; once a job or stream is finished its hash
+# expires and the status endpoints fall back to Mongo.
+FINISHED_JOB_TTL = 24 * 3600        # seconds after completed/failed
+FINISHED_STREAM_TTL = 24 * 3600     # seconds after stopped/failed
+FINISHED_JOB_STATUSES = {"completed", "failed"}
+FINISHED_STREAM_STATUSES = {"stopped", "failed"}
+
+COMPACT_INTERVAL = 600              # seconds between compactor passes
+COMPACT_LOCK_KEY = "retention:compactor"
+SCAN_BATCH = 500
+
+# Key prefixes reported in the key-space memory breakdown
+KEYSPACE_PREFIXES = ("job", "stream", "ingest", "probe", "pipeline")
+
+metrics.describe("vdo_redis_keys", "gauge", "Redis keys by prefix (last compactor pass)")
+metrics.describe("vdo_redis_keyspace_bytes", "gauge", "Redis memory by key prefix (last compactor pass)")
+metrics.describe("vdo_redis_used_memory_bytes", "gauge", "Redis used_memory")
+metrics.describe("vdo_redis_compacted_total", "counter", "Redis hashes trimmed or given a TTL by the compactor")
+
+
+def expire_job(job_key: str):
+    """Start the retention clock on a job hash once it has finished."""
+    if redis_client.hget(job_key, "status") in FINISHED_JOB_STATUSES:
+        redis_client.expire(job_key, FINISHED_JOB_TTL)
+
+
+def expire_stream(key: str):
+    """Same for stream:{id} / ingest:{id} hashes once stopped or failed."""
+    redis_client.expire(key, FINISHED_STREAM_TTL)
+
+
+def _compact_job(key: str, job: dict) -> bool:
+    changed = False
+    outputs = job.get("outputs")
+
+    if outputs:
+        try:
+            decoded = json.loads(outputs)
+        except ValueError:
+            decoded = None
+
+        # Analyze jobs from before compact analysis kept the whole ffprobe JSON
+        if isinstance(decoded, dict) and isinstance(decoded.get("metadata"), dict) and "streams" in decoded["metadata"]:
+            outputs = json.dumps({"analysis": compact_metadata(decoded["metadata"])})
+            redis_client.hset(key, "outputs", outputs)
+            changed = True
+
+        # Mongo always has the full outputs
+        if len(outputs) > REDIS_OUTPUT_LIMIT:
+            redis_client.hdel(key, "outputs")
+            redis_client.hset(key, "outputs_in_mongo", 1)
+            changed = True
+
+    if job.get("status") in FINISHED_JOB_STATUSES and redis_client.ttl(key) == -1:
+        redis_client.expire(key, FINISHED_JOB_TTL)
+        changed = True
+
+    return changed
+
+
+def compact() -> dict:
+    """
+    One pass over the key space: trim oversized job outputs, put TTLs on
+    finished hashes written before retention existed, and tally keys and
+    memory per prefix. Returns the tally.
+    """
+    report = {prefix: {"keys": 0, "bytes": 0} for prefix in (*KEYSPACE_PREFIXES, "other")}
+    compacted = 0
+
+    batch = []
+    for key in redis_client.scan_iter(count=SCAN_BATCH):
+        batch.append(key)
+        if len(batch) >= SCAN_BATCH:
+            compacted += _compact_batch(batch, report)
+            batch = []
+    if batch:
+        compacted += _compact_batch(batch, report)
+
+    for prefix, usage in report.items():
+        metrics.set_gauge("vdo_redis_keys", usage["keys"], prefix=prefix)
+        metrics.set_gauge("vdo_redis_keyspace_bytes", usage["bytes"], prefix=prefix)
+    metrics.inc("vdo_redis_compacted_total", compacted)
+
+    used = redis_client.info("memory").get("used_memory", 0)
+    metrics.set_gauge("vdo_redis_used_memory_bytes", used)
+
+    return {"used_memory": used, "compacted": compacted, "keyspace": report}
+
+
+def _compact_batch(keys: list, report: dict) -> int:
+    pipe = redis_client.pipeline(transaction=False)
+    for key in keys:
+        pipe.memory_usage(key)
+    sizes = pipe.execute()
+
+    compacted = 0
+    for key, size in zip(keys, sizes):
+        prefix = key.split(":", 1)[0]
+        usage = report[prefix if prefix in report else "other"]
+        usage["keys"] += 1
+        usage["bytes"] += size or 0
+
+        if prefix == "job":
+            job = redis_client.hgetall(key)
+            if job and _compact_job(key, job):
+                compacted += 1
+        elif prefix in ("stream", "ingest"):
+            if redis_client.hget(key, "status") in FINISHED_STREAM_STATUSES and redis_client.ttl(key) == -1:
+                expire_stream(key)
+                compacted += 1
+
+    return compacted
+
+
+def run_compactor(stop_event: threading.Event):
+    while not stop_event.wait(COMPACT_INTERVAL):
+        # One compactor per cluster, however many workers are running
+        if not redis_client.set(COMPACT_LOCK_KEY, 1, nx=True, ex=COMPACT_INTERVAL):
+            continue
+        try:
+            report = compact()
+            print(f"[retention] compacted {report['compacted']} key(s), used_memory={report['used_memory']}")
+        except Exception as e:
+            print(f"[retention] compactor pass failed: {e}")
+
+
+def start_compactor() -> threading.Event:
+    stop_event = threading.Event()
+    threading.Thread(target=run_compactor, args=(stop_event,), daemon=True).start()
+    return stop_event
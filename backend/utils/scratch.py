@@ -0,0 +1,178 @@
+import os
+import shutil
+import socket
+from pathlib import Path
+
+# Every job gets its own directory under one of these roots, removed
+# when the job ends. Small jobs of known size go to tmpfs when the host has one.
+SCRATCH_ROOT = Path(os.getenv("VDO_SCRATCH_DIR", "tmp"))
+TMPFS_ROOT = Path(os.getenv("VDO_TMPFS_DIR", "/dev/shm/vdo-scratch"))
+TMPFS_MAX_JOB_BYTES = 256 * 1024 ** 2   # jobs estimated above this stay on disk
+TMPFS_MAX_SHARE = 0.5                   # tmpfs is RAM — job dirs get at most this fraction of it
+
+# Admission: a job is only started if its estimate fits under the quota
+# (all job dirs on this host, disk and tmpfs together) and still leaves
+# the reserve free on the disk volume
+SCRATCH_QUOTA_BYTES = int(os.getenv("VDO_SCRATCH_QUOTA_BYTES", 50 * 1024 ** 3))
+SCRATCH_RESERVE_BYTES = 2 * 1024 ** 3
+# Input bytes -> scratch bytes (downloads + intermediates + output)
+SCRATCH_SIZE_FACTOR = 3
+# Running out of RAM is worse than out of disk, and an upscaling
+# normalize can write several times its input — be generous on tmpfs
+TMPFS_SIZE_FACTOR = 8
+SCRATCH_RETRY_DELAY = 10  # seconds before a worker picks up work again after a refusal
+SCRATCH_MAX_WAIT = 10 * 60  # seconds of refusals before the job is failed
+
+OWNER_FILE = ".owner"
+
+
+class ScratchBudgetExceeded(RuntimeError):
+    pass
+
+
+class ScratchTooLarge(RuntimeError):
+    """The estimate exceeds the quota or the volume itself — retrying won't help."""
+    pass
+
+
+def _dir_size(path: Path) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def _reserved(root: Path) -> int:
+    """Bytes promised to live job dirs: max(estimate, current size) each."""
+    total = 0
+    if not root.exists():
+        return 0
+    for job_dir in root.iterdir():
+        owner = job_dir / OWNER_FILE
+        if not owner.exists():
+            continue
+        try:
+            estimate = int(owner.read_text().split()[2])
+        except (OSError, IndexError, ValueError):
+            estimate = 0
+        total += max(estimate, _dir_size(job_dir))
+    return total
+
+
+def _usage(root: Path):
+    try:
+        root.mkdir(parents=True, exist_ok=True)
+        return shutil.disk_usage(root)
+    except OSError:
+        return None
+
+
+def _fits_disk(needed: int, shared: int) -> bool:
+    usage = _usage(SCRATCH_ROOT)
+    return (usage is not None
+            and usage.free - needed >= SCRATCH_RESERVE_BYTES
+            and shared + needed <= SCRATCH_QUOTA_BYTES)
+
+
+def _fits_tmpfs(needed: int, shared: int) -> bool:
+    if not TMPFS_ROOT.parent.is_dir():
+        return False
+    usage = _usage(TMPFS_ROOT)
+    return (usage is not None
+            and needed <= usage.free
+            and _reserved(TMPFS_ROOT) + needed <= usage.total * TMPFS_MAX_SHARE
+            and shared + needed <= SCRATCH_QUOTA_BYTES)
+
+
+def _capacity(root: Path) -> int | None:
+    """Most a single job could ever get on root's volume, None if unknown."""
+    try:
+        root.mkdir(parents=True, exist_ok=True)
+        return shutil.disk_usage(root).total - SCRATCH_RESERVE_BYTES
+    except OSError:
+        return None
+
+
+def acquire_scratch(job_id: str, input_bytes: int | None = 0) -> Path:
+    """
+    Create the job's private scratch dir. Raises ScratchBudgetExceeded
+    when the estimated footprint doesn't fit right now — the caller
+    should put the job back on the queue rather than fail it — and
+    ScratchTooLarge when it could never fit, which should fail the job.
+    input_bytes=None (size unknown) always goes to disk.
+    """
+    needed = (input_bytes or 0) * SCRATCH_SIZE_FACTOR
+
+    # Disk is the fallback for every job, so its volume bounds the largest one
+    capacity = _capacity(SCRATCH_ROOT)
+    if needed > SCRATCH_QUOTA_BYTES or (capacity is not None and needed > capacity):
+        limit = min(SCRATCH_QUOTA_BYTES, capacity) if capacity is not None else SCRATCH_QUOTA_BYTES
+        raise ScratchTooLarge(
+            f"Job {job_id} needs ~{needed >> 20} MiB of scratch, more than the {max(limit, 0) >> 20} MiB this host allows"
+        )
+
+    shared = _reserved(SCRATCH_ROOT) + _reserved(TMPFS_ROOT)
+    in_ram = (input_bytes or 0) * TMPFS_SIZE_FACTOR
+
+    if input_bytes is not None and in_ram <= TMPFS_MAX_JOB_BYTES and _fits_tmpfs(in_ram, shared):
+        root, needed = TMPFS_ROOT, in_ram
+    elif _fits_disk(needed, shared):
+        root = SCRATCH_ROOT
+    else:
+        raise ScratchBudgetExceeded(f"Job {job_id} needs ~{needed >> 20} MiB of scratch, not available")
+
+    job_dir = root / job_id
+    shutil.rmtree(job_dir, ignore_errors=True)
+    job_dir.mkdir(parents=True)
+    (job_dir / OWNER_FILE).write_text(f"{socket.gethostname()} {os.getpid()} {needed}\n")
+    return job_dir
+
+
+def release_scratch(job_dir: Path | None):
+    if job_dir is not None:
+        shutil.rmtree(job_dir, ignore_errors=True)
+
+
+def _owner_alive(job_dir: Path) -> bool:
+    try:
+        host, pid, _ = (job_dir / OWNER_FILE).read_text().split()
+    except (OSError, ValueError):
+        return False
+    if host != socket.gethostname():
+        # Shared volume — not ours to judge
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, ValueError):
+        return True
+    # Our own pid can only be a previous run's (containers restart as pid 1)
+    return int(pid) != os.getpid()
+
+
+def sweep_orphans() -> int:
+    """
+    Remove scratch left behind by crashed workers (dead owner pid) and
+    loose files from before per-job dirs. Run once at worker startup.
+    """
+    removed = 0
+    for root in (SCRATCH_ROOT, TMPFS_ROOT):
+        if not root.exists():
+            continue
+        for entry in root.iterdir():
+            if entry.is_dir() and _owner_alive(entry):
+                continue
+            if entry.is_dir():
+                shutil.rmtree(entry, ignore_errors=True)
+            else:
+                entry.unlink(missing_ok=True)
+            removed += 1
+
+    if removed:
+        print(f"[scratch] swept {removed} orphaned scratch entr{'y' if removed == 1 else 'ies'}")
+    return removed
@@ -1,5 +1,6 @@
 import subprocess
 import threading
+import hashlib
 import json
 import time
 from uuid import uuid4
@@ -7,6 +8,8 @@ from datetime import datetime, timezone
 from backend.utils.mongo import streams_col
 
 from backend.utils.redis_client import redis_client
+from backend.utils.retention import expire_stream
+from backend.utils.recording import create_recording_asset, build_record_command, start_uploader
 from ffmpeg.config import (
     TARGET_WIDTH,
     TARGET_HEIGHT,
@@ -14,9 +17,49 @@ from ffmpeg.config import (
     TARGET_LUFS,
     TARGET_SAMPLE_RATE,
 )
+from ffmpeg.profiles import DEFAULT_PROFILE, encoder_args
+from ffmpeg.utils.ffmpeg import plan_frame_rate
 
 MEDIAMTX_RTMP_BASE = "rtmp://localhost:1935/live"
+MEDIAMTX_RTSP_BASE = "rtsp://localhost:8554/live"
+
+# One ingest (camera connection + decode + normalize) per source URL.
+# The ingest publishes to an internal MediaMTX path; every requested
+# stream is an output that reads that path, so cameras are opened and
+# decoded once no matter how many outputs are attached.
+INGESTS: dict[str, dict] = {}
+# Outputs keyed by stream_id
 ACTIVE_STREAMS: dict[str, dict] = {}
+_LOCK = threading.Lock()
+
+# live    — stream copy of the normalized ingest to live/{stream_id}
+# preview — low-res, low-fps rendition of the ingest
+# record  — segmented recording uploaded to MinIO as a VOD asset
+OUTPUT_KINDS = ("live", "preview", "record")
+PREVIEW_HEIGHT = 360
+PREVIEW_FPS = 15
+
+MAX_RECONNECT_ATTEMPTS = 5
+RECONNECT_DELAY = 5  # seconds between reconnect attempts
+INGEST_READY_TIMEOUT = 60  # seconds an output waits for its ingest's first frame
+
+# Processing profiles for live streams, cheapest first:
+#   passthrough — source is already H.264 at target size: copy video, transcode audio only
+#   light       — fast_bilinear scale, no audio denoise
+#   full        — lanczos scale + afftdn (for low-res sources where quality matters)
+LIVE_PROFILES = ("passthrough", "light", "full")
+PASSTHROUGH_CODECS = {"h264"}
+PASSTHROUGH_PIX_FMTS = {"yuv420p", "yuvj420p"}
+# Webcams output High 4:2:2, so live encodes use the High profile
+LIVE_ENCODING_PROFILE = {**DEFAULT_PROFILE, "name": "live", "h264_profile": "high"}
+# Sources below this height get the full-quality upscale path
+FULL_PROFILE_MAX_HEIGHT = 720
+
+# Probe settings: (analyzeduration µs, probesize bytes).
+# The fast pair is only used when a cached probe already told us the codecs.
+FULL_PROBE = ("10000000", "10000000")
+FAST_PROBE = ("500000", "500000")
+PROBE_CACHE_TTL = 24 * 3600  # seconds
 import os
 from pathlib import Path
 
@@ -31,8 +74,46 @@ def _set_redis(stream_id: str, fields: dict):
     redis_client.hset(_redis_key(stream_id), mapping=fields)
 
 
+def _probe_cache_key(rtsp_url: str) -> str:
+    # Hash the URL so camera credentials never end up in key names
+    return f"probe:{hashlib.sha1(rtsp_url.encode()).hexdigest()}"
+
+
+def _get_cached_probe(rtsp_url: str) -> dict | None:
+    """
+    Return the cached probe for this camera if it still carries usable
+    codec info (video codec + geometry), otherwise None.
+    """
+    raw = redis_client.get(_probe_cache_key(rtsp_url))
+    if not raw:
+        return None
+
+    try:
+        data = json.loads(raw)
+    except ValueError:
+        return None
+
+    video = next(
+        (s for s in data.get("streams", []) if s.get("codec_type") == "video"),
+        None,
+    )
+    if not video or not video.get("codec_name") or not video.get("width") or not video.get("height"):
+        return None
+
+    return data
+
+
+def _cache_probe(rtsp_url: str, metadata: dict):
+    redis_client.set(_probe_cache_key(rtsp_url), json.dumps(metadata), ex=PROBE_CACHE_TTL)
+
+
+def invalidate_probe_cache(rtsp_url: str):
+    redis_client.delete(_probe_cache_key(rtsp_url))
+
+
 def _get_metadata_live(rtsp_url: str) -> dict | None:
     is_rtsp = rtsp_url.startswith("rtsp://")
+    analyzeduration, probesize = FULL_PROBE
 
     command = ["ffprobe", "-v", "quiet"]
 
@@ -40,8 +121,8 @@ def _get_metadata_live(rtsp_url: str) -> dict | None:
         command.extend(["-rtsp_transport", "tcp"])
 
     command.extend([
-        "-analyzeduration", "10000000",
-        "-probesize", "10000000",
+        "-analyzeduration", analyzeduration,
+        "-probesize", probesize,
         "-print_format", "json",
         "-show_streams",
         rtsp_url,
@@ -65,50 +146,90 @@ def _get_metadata_live(rtsp_url: str) -> dict | None:
         print(f"[stream_manager] ffprobe failed: {e}")
         return None
     
-def _build_ffmpeg_command(input_url: str, rtmp_url: str, has_audio: bool) -> list[str]:
+def _choose_live_profile(metadata: dict) -> str:
+    """
+    Pick the cheapest profile that still delivers the target output.
+
+    Cameras that already send 1080p H.264 are passed through untouched
+    (their native frame rate is kept; duplicating frames up to TARGET_FPS
+    costs a full encode for no visual gain).
+    """
+    video = next(
+        (s for s in metadata.get("streams", []) if s.get("codec_type") == "video"),
+        None,
+    )
+    if not video:
+        return "full"
+
+    width = int(video.get("width") or 0)
+    height = int(video.get("height") or 0)
+
+    if (
+        video.get("codec_name") in PASSTHROUGH_CODECS
+        and video.get("pix_fmt") in PASSTHROUGH_PIX_FMTS
+        and width == TARGET_WIDTH
+        and height == TARGET_HEIGHT
+    ):
+        return "passthrough"
+
+    # Partial probes may miss the geometry — assume a normal camera
+    if height and height < FULL_PROFILE_MAX_HEIGHT:
+        return "full"
+
+    return "light"
+
+
+def _build_ffmpeg_command(input_url: str, rtmp_url: str, has_audio: bool, profile: str = "full",
+                          fast_probe: bool = False, fps_filter: str | None = f"fps={TARGET_FPS}") -> list[str]:
+    scale_flags = "lanczos" if profile == "full" else "fast_bilinear"
+
     video_filters = [
-        f"scale={TARGET_WIDTH}:{TARGET_HEIGHT}:flags=lanczos:force_original_aspect_ratio=decrease",
+        f"scale={TARGET_WIDTH}:{TARGET_HEIGHT}:flags={scale_flags}:force_original_aspect_ratio=decrease",
         f"pad={TARGET_WIDTH}:{TARGET_HEIGHT}:(ow-iw)/2:(oh-ih)/2",
-        f"fps={TARGET_FPS}",
+        *([fps_filter] if fps_filter else []),
         "format=yuv420p",
-    ]
+    ] if profile != "passthrough" else []
 
     audio_filters = [
-        "afftdn",
         f"loudnorm=I={TARGET_LUFS}:LRA=11:TP=-1.5",
         "alimiter",
     ] if has_audio else []
 
+    if audio_filters and profile == "full":
+        audio_filters.insert(0, "afftdn")
+
     is_rtsp = input_url.startswith("rtsp://")
 
     # Input section — no filter flags here
-    cmd = ["ffmpeg", "-y"]
+    # -progress on stdout lets _watch_first_frame see when frames start flowing
+    cmd = ["ffmpeg", "-y", "-nostats", "-progress", "pipe:1"]
 
     if is_rtsp:
         cmd.extend(["-rtsp_transport", "tcp"])
 
+    analyzeduration, probesize = FAST_PROBE if fast_probe else FULL_PROBE
+
     cmd.extend([
         "-fflags", "nobuffer+genpts",
         "-flags", "low_delay",
-        "-analyzeduration", "10000000",
-        "-probesize", "10000000",
+        "-analyzeduration", analyzeduration,
+        "-probesize", probesize,
         "-i", input_url,   # -i MUST come before any output flags
     ])
 
     # Output section — filters go here, after -i
-    cmd.extend(["-vf", ",".join(video_filters)])
+    if video_filters:
+        cmd.extend(["-vf", ",".join(video_filters)])
 
     if audio_filters:
         cmd.extend(["-af", ",".join(audio_filters)])
 
+    if profile == "passthrough":
+        cmd.extend(["-c:v", "copy"])
+    else:
+        cmd.extend(encoder_args(LIVE_ENCODING_PROFILE, tune="zerolatency"))
+
     cmd.extend([
-        "-c:v", "libx264",
-        "-profile:v", "high",          # changed from "main" — webcam outputs High 4:2:2
-        "-level", "4.0",
-        "-pix_fmt", "yuv420p",
-        "-preset", "veryfast",
-        "-tune", "zerolatency",
-        "-crf", "23",
         "-c:a", "aac",
         "-ar", str(TARGET_SAMPLE_RATE),
         "-f", "flv",
@@ -117,15 +238,102 @@ def _build_ffmpeg_command(input_url: str, rtmp_url: str, has_audio: bool) -> lis
 
     return cmd
 
-def _monitor_process(stream_id: str):
+def _ingest_id(rtsp_url: str) -> str:
+    return hashlib.sha1(rtsp_url.encode()).hexdigest()[:16]
 
-    MAX_RECONNECT_ATTEMPTS = 5
-    RECONNECT_DELAY = 5  # seconds between reconnect attempts
 
-    entry = ACTIVE_STREAMS.get(stream_id)
-    if not entry:
-        return
+def _ingest_redis_key(ingest_id: str) -> str:
+    return f"ingest:{ingest_id}"
+
+
+def _set_ingest_redis(ingest_id: str, fields: dict):
+    redis_client.hset(_ingest_redis_key(ingest_id), mapping=fields)
+
+
+def _build_output_command(kind: str, source_url: str, rtmp_url: str) -> list[str]:
+    cmd = [
+        "ffmpeg", "-y", "-nostats", "-progress", "pipe:1",
+        "-rtsp_transport", "tcp",
+        "-fflags", "nobuffer",
+        "-i", source_url,
+    ]
+
+    if kind == "preview":
+        cmd.extend([
+            "-vf", f"scale=-2:{PREVIEW_HEIGHT}:flags=fast_bilinear,fps={PREVIEW_FPS}",
+            "-c:v", "libx264",
+            "-preset", "ultrafast",
+            "-tune", "zerolatency",
+            "-crf", "30",
+            "-c:a", "aac",
+            "-b:a", "64k",
+        ])
+    else:
+        # The ingest already normalized everything — just re-publish it
+        cmd.extend(["-c", "copy"])
+
+    cmd.extend(["-f", "flv", rtmp_url])
+    return cmd
 
+
+# -------------------------------------------------
+# Process supervision (shared by ingests and outputs)
+# -------------------------------------------------
+
+def _spawn(name: str, entry: dict, cmd: list[str], on_first_frame) -> subprocess.Popen:
+    log_file = open(f"logs/{name}.log", "w")
+    proc = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=log_file,   # write to file instead of PIPE
+        text=True,
+    )
+    entry["process"] = proc
+    entry["first_frame"] = False
+
+    # First launch counts from the API request (probe included),
+    # reconnects count from the respawn
+    launched_at = entry.pop("requested_at", time.monotonic())
+
+    watcher = threading.Thread(
+        target=_watch_first_frame,
+        args=(name, entry, proc, launched_at, on_first_frame),
+        daemon=True,
+    )
+    watcher.start()
+    return proc
+
+
+def _watch_first_frame(name: str, entry: dict, proc: subprocess.Popen, launched_at: float, on_first_frame):
+    """
+    Read FFmpeg's -progress output until the first frame is encoded, then
+    report time-to-first-frame. Keeps draining stdout afterwards so the
+    pipe never fills up.
+    """
+    for line in proc.stdout:
+        if entry["first_frame"] or not line.startswith("frame="):
+            continue
+
+        try:
+            frames = int(line.split("=", 1)[1])
+        except ValueError:
+            continue
+
+        if frames > 0:
+            entry["first_frame"] = True
+            ttff_ms = int((time.monotonic() - launched_at) * 1000)
+            print(f"[stream_manager] {name} first frame after {ttff_ms} ms")
+            if not entry["stop_event"].is_set():
+                on_first_frame(ttff_ms)
+
+
+def _supervise(name: str, entry: dict, respawn, before_respawn=None) -> bool:
+    """
+    Wait on the entry's FFmpeg process and restart it on unexpected exits.
+
+    Returns True when the entry was stopped on purpose, False when it gave
+    up after MAX_RECONNECT_ATTEMPTS (the caller marks it failed).
+    """
     attempts = 0
 
     while True:
@@ -133,161 +341,481 @@ def _monitor_process(stream_id: str):
         return_code = proc.wait()  # blocks until FFmpeg exits
 
         # Check if we were asked to stop
-        current_status = redis_client.hget(_redis_key(stream_id), "status")
-        if isinstance(current_status, bytes):
-            current_status = current_status.decode()
+        if entry["stop_event"].is_set():
+            print(f"[stream_manager] {name} stopped cleanly.")
+            return True
 
-        if current_status == "stopped" or stream_id not in ACTIVE_STREAMS:
-            print(f"[stream_manager] Stream {stream_id} stopped cleanly.")
-            break
+        # Died before producing a frame with the short probe: the cached
+        # codec info is probably stale, so probe properly next time.
+        if entry.get("fast_probe") and not entry["first_frame"]:
+            print(f"[stream_manager] {name} failed with cached probe, invalidating it.")
+            invalidate_probe_cache(entry["rtsp_url"])
+            entry["fast_probe"] = False
 
         # Unexpected exit — attempt reconnect
         attempts += 1
         if attempts > MAX_RECONNECT_ATTEMPTS:
-            print(f"[stream_manager] Stream {stream_id} exceeded reconnect attempts. Giving up.")
-            _set_redis(stream_id, {"status": "failed", "error": "Max reconnect attempts exceeded"})
-            streams_col.update_one(
-                {"_id": stream_id},
-                {"$set": {"status": "failed", "updated_at": datetime.now(timezone.utc)}}
-            )
-            ACTIVE_STREAMS.pop(stream_id, None)
-            break
-
-        print(f"[stream_manager] Stream {stream_id} exited (code {return_code}). "
+            print(f"[stream_manager] {name} exceeded reconnect attempts. Giving up.")
+            return False
+
+        print(f"[stream_manager] {name} exited (code {return_code}). "
               f"Reconnecting in {RECONNECT_DELAY}s (attempt {attempts}/{MAX_RECONNECT_ATTEMPTS})...")
 
-        _set_redis(stream_id, {"status": "reconnecting", "reconnect_attempt": attempts})
-        time.sleep(RECONNECT_DELAY)
+        entry["on_reconnecting"](attempts)
+        if entry["stop_event"].wait(RECONNECT_DELAY):
+            print(f"[stream_manager] {name} stopped while reconnecting.")
+            return True
 
-        # Restart FFmpeg
-        rtsp_url = entry["rtsp_url"]
-        rtmp_url = entry["rtmp_url"]
-        has_audio = entry.get("has_audio", True)
-        cmd = _build_ffmpeg_command(rtsp_url, rtmp_url, has_audio)
+        if before_respawn and not before_respawn():
+            return entry["stop_event"].is_set()
 
+        # Restart FFmpeg — status flips back to "live" on the first frame
         try:
-            log_file = open(f"logs/{stream_id}.log", "w")
-
-            new_proc = subprocess.Popen(
-                cmd,
-                stdout=subprocess.DEVNULL,
-                stderr=log_file,  # capture stderr for debugging
-            )
-            entry["process"] = new_proc
-            _set_redis(stream_id, {"status": "live", "reconnect_attempt": attempts})
-            print(f"[stream_manager] Stream {stream_id} reconnected.")
+            respawn()
+            print(f"[stream_manager] {name} restarted.")
         except Exception as e:
-            print(f"[stream_manager] Failed to restart FFmpeg for {stream_id}: {e}")
-            _set_redis(stream_id, {"status": "failed", "error": str(e)})
-            ACTIVE_STREAMS.pop(stream_id, None)
-            break
+            print(f"[stream_manager] Failed to restart FFmpeg for {name}: {e}")
+            return False
+
+
+# -------------------------------------------------
+# Ingests
+# -------------------------------------------------
+
+def _fail_stream(stream_id: str, error: str):
+    with _LOCK:
+        entry = ACTIVE_STREAMS.pop(stream_id, None)
+        ingest = INGESTS.get(entry["rtsp_url"]) if entry else None
+        # A failed ingest is already out of INGESTS, and a newer ingest on the
+        # same URL never holds this output — leave both alone
+        if ingest and stream_id not in ingest["outputs"]:
+            ingest = None
+        last_output = False
+        if ingest:
+            ingest["outputs"].discard(stream_id)
+            last_output = not ingest["outputs"]
+            if last_output:
+                INGESTS.pop(entry["rtsp_url"])
+
+    if entry:
+        entry["stop_event"].set()
+        proc = entry["process"]
+        if proc is not None and proc.poll() is None:
+            proc.kill()
 
+    _set_redis(stream_id, {"status": "failed", "error": error})
+    expire_stream(_redis_key(stream_id))
+    streams_col.update_one(
+        {"_id": stream_id},
+        {"$set": {"status": "failed", "error": error, "updated_at": datetime.now(timezone.utc)}}
+    )
+
+    if ingest:
+        if last_output:
+            _stop_ingest(ingest)
+        else:
+            _set_ingest_redis(ingest["ingest_id"], {"refcount": len(ingest["outputs"])})
 
-def start_stream(rtsp_url: str, stream_id: str | None = None) -> dict:
-    stream_id = stream_id or str(uuid4())
-    rtmp_url = f"{MEDIAMTX_RTMP_BASE}/{stream_id}"
 
-    # Probe the source
-    print(f"[stream_manager] Probing {rtsp_url}...")
-    metadata = _get_metadata_live(rtsp_url)
-    if not metadata:
-        raise RuntimeError(f"Could not probe RTSP source: {rtsp_url}")
+def _fail_ingest(ingest: dict, error: str):
+    with _LOCK:
+        if INGESTS.get(ingest["rtsp_url"]) is ingest:
+            INGESTS.pop(ingest["rtsp_url"])
+        outputs = list(ingest["outputs"])
+
+    ingest["stop_event"].set()
+    _set_ingest_redis(ingest["ingest_id"], {"status": "failed", "error": error, "refcount": 0})
+    expire_stream(_ingest_redis_key(ingest["ingest_id"]))
+
+    for stream_id in outputs:
+        _fail_stream(stream_id, f"Ingest failed: {error}")
+
+
+def _spawn_ingest(ingest: dict):
+    ingest_id = ingest["ingest_id"]
+    cmd = _build_ffmpeg_command(
+        ingest["rtsp_url"],
+        ingest["publish_url"],
+        ingest.get("has_audio", True),
+        ingest.get("profile", "full"),
+        fast_probe=ingest.get("fast_probe", False),
+        fps_filter=ingest["fps_plan"]["filter"],
+    )
+
+    def on_first_frame(ttff_ms: int):
+        ingest["ready"].set()
+        _set_ingest_redis(ingest_id, {"status": "live", "time_to_first_frame_ms": ttff_ms})
+
+    _spawn(f"ingest_{ingest_id}", ingest, cmd, on_first_frame)
+
+
+def _run_ingest(ingest: dict):
+    """
+    Probe (or reuse the cached probe), choose a profile, start the ingest
+    FFmpeg and supervise it until the last output detaches.
+    """
+    rtsp_url = ingest["rtsp_url"]
+    ingest_id = ingest["ingest_id"]
+
+    metadata = _get_cached_probe(rtsp_url)
+    probe_cached = metadata is not None
+
+    if not probe_cached:
+        print(f"[stream_manager] Probing {rtsp_url}...")
+        metadata = _get_metadata_live(rtsp_url)
+        if not metadata:
+            _fail_ingest(ingest, f"Could not probe RTSP source: {rtsp_url}")
+            return
+        _cache_probe(rtsp_url, metadata)
 
     has_video = any(s["codec_type"] == "video" for s in metadata.get("streams", []))
     has_audio = any(s["codec_type"] == "audio" for s in metadata.get("streams", []))
 
     if not has_video:
-        raise RuntimeError("RTSP source has no video stream.")
+        _fail_ingest(ingest, "RTSP source has no video stream.")
+        return
 
-    # Build and launch FFmpeg
-    cmd = _build_ffmpeg_command(rtsp_url, rtmp_url, has_audio)
-    print(f"[stream_manager] Starting FFmpeg for stream {stream_id}")
+    profile = ingest.get("profile") or _choose_live_profile(metadata)
+    video = next(s for s in metadata["streams"] if s["codec_type"] == "video")
 
-    log_file = open(f"logs/{stream_id}.log", "w")
-    proc = subprocess.Popen(
-        cmd,
-        stdout=subprocess.DEVNULL,
-        stderr=log_file,   # write to file instead of PIPE
-    )
+    ingest["has_audio"] = has_audio
+    ingest["profile"] = profile
+    ingest["fast_probe"] = probe_cached
+    # Keep the camera's own rate (capped at TARGET_FPS) instead of duplicating frames
+    ingest["fps_plan"] = plan_frame_rate(video, LIVE_ENCODING_PROFILE)
 
-    now = datetime.now(timezone.utc)
+    if ingest["stop_event"].is_set():
+        return
 
-    entry = {
-        "process": proc,
-        "rtsp_url": rtsp_url,
-        "rtmp_url": rtmp_url,
-        "has_audio": has_audio,
-    }
-    ACTIVE_STREAMS[stream_id] = entry
+    print(f"[stream_manager] Starting ingest {ingest_id} "
+          f"(profile: {profile}, cached probe: {probe_cached})")
 
-    # Persist to Redis
-    _set_redis(stream_id, {
-        "stream_id": stream_id,
-        "status": "live",
-        "rtsp_url": rtsp_url,
-        "rtmp_url": rtmp_url,
+    _set_ingest_redis(ingest_id, {
         "has_audio": int(has_audio),
-        "started_at": now.isoformat(),
-        "reconnect_attempt": 0,
+        "profile": profile,
+        "probe_cached": int(probe_cached),
+        "output_fps": ingest["fps_plan"]["output_fps"],
     })
 
-    # Persist to Mongo
-    streams_col.insert_one({
-        "_id": stream_id,
-        "stream_id": stream_id,
-        "rtsp_url": rtsp_url,
-        "rtmp_url": rtmp_url,
-        "status": "live",
-        "has_audio": has_audio,
-        "created_at": now,
-        "updated_at": now,
+    def on_reconnecting(attempt: int):
+        ingest["ready"].clear()
+        _set_ingest_redis(ingest_id, {"status": "reconnecting", "reconnect_attempt": attempt})
+
+    ingest["on_reconnecting"] = on_reconnecting
+
+    try:
+        _spawn_ingest(ingest)
+    except Exception as e:
+        print(f"[stream_manager] Failed to start ingest {ingest_id}: {e}")
+        _fail_ingest(ingest, str(e))
+        return
+
+    # The last output may have detached while we were probing
+    if ingest["stop_event"].is_set():
+        ingest["process"].terminate()
+        return
+
+    if not _supervise(f"ingest_{ingest_id}", ingest, lambda: _spawn_ingest(ingest)):
+        _fail_ingest(ingest, "Max reconnect attempts exceeded")
+
+
+def _stop_ingest(ingest: dict):
+    ingest["stop_event"].set()
+    ingest["ready"].clear()
+
+    proc = ingest["process"]
+    if proc is not None:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+    _set_ingest_redis(ingest["ingest_id"], {"status": "stopped", "refcount": 0})
+    expire_stream(_ingest_redis_key(ingest["ingest_id"]))
+    print(f"[stream_manager] Ingest {ingest['ingest_id']} stopped (no outputs left).")
+
+
+# -------------------------------------------------
+# Outputs
+# -------------------------------------------------
+
+def _wait_for_ingest(entry: dict, ingest: dict) -> bool:
+    """Block until the ingest is publishing. False if stopped or timed out."""
+    deadline = time.monotonic() + INGEST_READY_TIMEOUT
+    while not ingest["ready"].wait(1):
+        if entry["stop_event"].is_set() or ingest["stop_event"].is_set():
+            return False
+        if time.monotonic() > deadline:
+            return False
+    return not entry["stop_event"].is_set()
+
+
+def _spawn_output(stream_id: str, entry: dict, ingest: dict):
+    if entry["kind"] == "record":
+        cmd = build_record_command(ingest["local_url"], entry["recording"])
+    else:
+        cmd = _build_output_command(entry["kind"], ingest["local_url"], entry["rtmp_url"])
+
+    def on_first_frame(ttff_ms: int):
+        _set_redis(stream_id, {"status": "live", "time_to_first_frame_ms": ttff_ms})
+        streams_col.update_one(
+            {"_id": stream_id},
+            {"$set": {"status": "live", "time_to_first_frame_ms": ttff_ms,
+                      "updated_at": datetime.now(timezone.utc)}}
+        )
+
+    _spawn(stream_id, entry, cmd, on_first_frame)
+
+
+def _run_output(stream_id: str, ingest: dict):
+    entry = ACTIVE_STREAMS.get(stream_id)
+    if not entry:
+        return
+
+    if not _wait_for_ingest(entry, ingest):
+        if not entry["stop_event"].is_set():
+            _fail_stream(stream_id, "Ingest did not become ready")
+        return
+
+    _set_redis(stream_id, {
+        "profile": ingest.get("profile", ""),
+        "probe_cached": int(ingest.get("fast_probe", False)),
     })
 
-    # Start monitor thread
-    thread = threading.Thread(target=_monitor_process, args=(stream_id,), daemon=True)
+    def on_reconnecting(attempt: int):
+        _set_redis(stream_id, {"status": "reconnecting", "reconnect_attempt": attempt})
+
+    entry["on_reconnecting"] = on_reconnecting
+
+    try:
+        _spawn_output(stream_id, entry, ingest)
+    except Exception as e:
+        print(f"[stream_manager] Failed to start output {stream_id}: {e}")
+        _fail_stream(stream_id, str(e))
+        return
+
+    # Outputs only respawn once their ingest is publishing again
+    stopped = _supervise(
+        stream_id,
+        entry,
+        lambda: _spawn_output(stream_id, entry, ingest),
+        before_respawn=lambda: _wait_for_ingest(entry, ingest),
+    )
+    if not stopped:
+        _fail_stream(stream_id, "Max reconnect attempts exceeded")
+
+
+def start_stream(rtsp_url: str, stream_id: str | None = None, profile: str | None = None,
+                 output: str = "live") -> dict:
+    """
+    Attach an output to the ingest for this source (starting the ingest if
+    it is the first one) and return immediately with status "starting".
+
+    Probing and FFmpeg startup happen on background threads; poll
+    get_stream_status until it reports "live" (or "failed"). The profile
+    only applies when this call creates the ingest.
+    """
+    if profile is not None and profile not in LIVE_PROFILES:
+        raise RuntimeError(f"Unknown live profile '{profile}'. Expected one of {LIVE_PROFILES}.")
+    if output not in OUTPUT_KINDS:
+        raise RuntimeError(f"Unknown output '{output}'. Expected one of {OUTPUT_KINDS}.")
+
+    stream_id = stream_id or str(uuid4())
+    # Recordings go to MinIO, not MediaMTX
+    rtmp_url = f"{MEDIAMTX_RTMP_BASE}/{stream_id}" if output != "record" else ""
+    now = datetime.now(timezone.utc)
+
+    with _LOCK:
+        if stream_id in ACTIVE_STREAMS:
+            raise RuntimeError(f"Stream {stream_id} is already active.")
+
+        ingest = INGESTS.get(rtsp_url)
+        created = ingest is None
+        if created:
+            ingest_id = _ingest_id(rtsp_url)
+            path = f"_ingest_{ingest_id}"
+            ingest = {
+                "ingest_id": ingest_id,
+                "rtsp_url": rtsp_url,
+                "publish_url": f"{MEDIAMTX_RTMP_BASE}/{path}",
+                "local_url": f"{MEDIAMTX_RTSP_BASE}/{path}",
+                "process": None,
+                "profile": profile,
+                "first_frame": False,
+                "ready": threading.Event(),
+                "stop_event": threading.Event(),
+                "requested_at": time.monotonic(),
+                "outputs": set(),
+            }
+            INGESTS[rtsp_url] = ingest
+
+        ingest["outputs"].add(stream_id)
+        refcount = len(ingest["outputs"])
+
+        entry = {
+            "process": None,
+            "kind": output,
+            "ingest_id": ingest["ingest_id"],
+            "rtsp_url": rtsp_url,
+            "rtmp_url": rtmp_url,
+            "first_frame": False,
+            "stop_event": threading.Event(),
+            "requested_at": time.monotonic(),
+        }
+        ACTIVE_STREAMS[stream_id] = entry
+
+    ingest_id = ingest["ingest_id"]
+
+    recording_asset_id = None
+    try:
+        if output == "record":
+            entry["recording"] = create_recording_asset(stream_id, rtsp_url)
+            recording_asset_id = entry["recording"]["asset_id"]
+
+        if created:
+            _set_ingest_redis(ingest_id, {
+                "ingest_id": ingest_id,
+                "status": "starting",
+                "rtsp_url": rtsp_url,
+                "started_at": now.isoformat(),
+            })
+        _set_ingest_redis(ingest_id, {"refcount": refcount})
+
+        # Persist to Redis
+        _set_redis(stream_id, {
+            "stream_id": stream_id,
+            "status": "starting",
+            "rtsp_url": rtsp_url,
+            "rtmp_url": rtmp_url,
+            "ingest_id": ingest_id,
+            "output": output,
+            "recording_asset_id": recording_asset_id or "",
+            "started_at": now.isoformat(),
+            "reconnect_attempt": 0,
+        })
+
+        # Persist to Mongo
+        streams_col.insert_one({
+            "_id": stream_id,
+            "stream_id": stream_id,
+            "rtsp_url": rtsp_url,
+            "rtmp_url": rtmp_url,
+            "ingest_id": ingest_id,
+            "output": output,
+            "recording_asset_id": recording_asset_id,
+            "status": "starting",
+            "created_at": now,
+            "updated_at": now,
+        })
+    except Exception as e:
+        # e.g. DuplicateKeyError for a reused stream_id — don't leave the
+        # output registered, or an ingest nobody will ever start
+        _rollback_start(stream_id, ingest, created, str(e))
+        raise
+
+    if created:
+        thread = threading.Thread(target=_run_ingest, args=(ingest,), daemon=True)
+        ingest["thread"] = thread
+        thread.start()
+
+    thread = threading.Thread(target=_run_output, args=(stream_id, ingest), daemon=True)
     entry["thread"] = thread
     thread.start()
 
+    if output == "record":
+        entry["uploader"] = start_uploader(entry["recording"], entry)
+
     return {
         "stream_id": stream_id,
         "rtmp_url": rtmp_url,
         "hls_preview": f"http://localhost:8888/{stream_id}/index.m3u8",
-        "status": "live",
+        "status": "starting",
+        "profile": ingest.get("profile"),
+        "ingest_id": ingest_id,
+        "output": output,
+        "shared_ingest": not created,
+        "recording_asset_id": recording_asset_id,
     }
 
 
+def _rollback_start(stream_id: str, ingest: dict, created: bool, error: str):
+    """Undo start_stream's registration after its persistence writes failed."""
+    try:
+        # The Redis hash may already say "starting" — it must not stay that way
+        _set_redis(stream_id, {"status": "failed", "error": error})
+        expire_stream(_redis_key(stream_id))
+    except Exception as e:
+        print(f"[stream_manager] Could not mark {stream_id} failed: {e}")
+
+    with _LOCK:
+        ACTIVE_STREAMS.pop(stream_id, None)
+        ingest["outputs"].discard(stream_id)
+        orphaned = not ingest["outputs"]
+        if orphaned and INGESTS.get(ingest["rtsp_url"]) is ingest:
+            INGESTS.pop(ingest["rtsp_url"])
+
+    if orphaned:
+        _stop_ingest(ingest)
+    elif created:
+        # Outputs attached in the meantime are waiting on this ingest
+        thread = threading.Thread(target=_run_ingest, args=(ingest,), daemon=True)
+        ingest["thread"] = thread
+        thread.start()
+
+
 def stop_stream(stream_id: str) -> dict:
 
-    entry = ACTIVE_STREAMS.get(stream_id)
-    if not entry:
-        raise RuntimeError(f"Stream {stream_id} not found in active streams.")
+    with _LOCK:
+        entry = ACTIVE_STREAMS.pop(stream_id, None)
+        if not entry:
+            raise RuntimeError(f"Stream {stream_id} not found in active streams.")
+
+        ingest = INGESTS.get(entry["rtsp_url"])
+        last_output = False
+        if ingest:
+            ingest["outputs"].discard(stream_id)
+            last_output = not ingest["outputs"]
+            if last_output:
+                INGESTS.pop(entry["rtsp_url"])
 
-    # Mark as stopped in Redis BEFORE killing process
+    # Mark as stopped BEFORE killing process
     # so the monitor thread doesn't try to reconnect
+    entry["stop_event"].set()
     _set_redis(stream_id, {"status": "stopped"})
+    expire_stream(_redis_key(stream_id))
 
     proc = entry["process"]
-    proc.terminate()
-    try:
-        proc.wait(timeout=10)
-    except subprocess.TimeoutExpired:
-        proc.kill()
-
-    ACTIVE_STREAMS.pop(stream_id, None)
+    if proc is not None:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
 
     streams_col.update_one(
         {"_id": stream_id},
         {"$set": {"status": "stopped", "updated_at": datetime.now(timezone.utc)}}
     )
 
-    return {"stream_id": stream_id, "status": "stopped"}
+    if ingest:
+        if last_output:
+            _stop_ingest(ingest)
+        else:
+            _set_ingest_redis(ingest["ingest_id"], {"refcount": len(ingest["outputs"])})
+
+    return {"stream_id": stream_id, "status": "stopped", "ingest_stopped": last_output}
 
 
 def get_stream_status(stream_id: str) -> dict | None:
     
     data = redis_client.hgetall(_redis_key(stream_id))
     if not data:
-        return None
+        # Finished streams expire from Redis — Mongo keeps the final state
+        doc = streams_col.find_one({"_id": stream_id}, {"_id": 0, "created_at": 0, "updated_at": 0})
+        if not doc:
+            return None
+        return {k: v for k, v in doc.items() if v is not None}
     return {
         k.decode() if isinstance(k, bytes) else k:
         v.decode() if isinstance(v, bytes) else v
@@ -296,4 +824,17 @@ def get_stream_status(stream_id: str) -> dict | None:
 
 
 def list_active_streams() -> list[str]:
-    return list(ACTIVE_STREAMS.keys())
\ No newline at end of file
+    return list(ACTIVE_STREAMS.keys())
+
+
+def list_ingests() -> list[dict]:
+    with _LOCK:
+        return [
+            {
+                "ingest_id": ingest["ingest_id"],
+                "profile": ingest.get("profile"),
+                "live": ingest["ready"].is_set(),
+                "outputs": sorted(ingest["outputs"]),
+            }
+            for ingest in INGESTS.values()
+        ]
@@ -1,9 +1,38 @@
 import json
-from backend.utils.redis_client import redis_client, JOB_QUEUE
+import time
+from backend.utils.redis_client import redis_client, JOB_QUEUE, PREVIEW_QUEUE
 from backend.utils.job import JobStatus, JobType
-from ffmpeg.utils.ffmpeg import get_metadata,process_video,merge_videos_with_crossfade
-from backend.utils.minio import s3, BUCKET_NAME
+from ffmpeg.utils.ffmpeg import (
+    get_metadata,
+    process_video,
+    merge_videos_with_crossfade,
+    apply_broadcast_match,
+    generate_thumbnails,
+    get_keyframe_index,
+    build_thumbnail_vtt,
+    plan_frame_rate,
+    detect_scenes,
+    generate_preview,
+)
+from ffmpeg.config import THUMB_INTERVAL, THUMB_WIDTH, THUMB_HEIGHT, SPRITE_COLUMNS, SPRITE_ROWS
+from ffmpeg.profiles import DEFAULT_PROFILE, profile_fingerprint
+from backend.utils.minio import s3, BUCKET_NAME, presign_get, upload_file, download_file
 from backend.utils.stream_manager import start_stream
+from backend.utils.metrics import record_job, start_metrics_server, inc
+from backend.utils.analysis import compact_metadata, REDIS_OUTPUT_LIMIT
+from backend.utils.retention import expire_job, start_compactor
+from backend.utils.pipeline import advance_pipeline
+from backend.utils.clients import setting
+from backend.utils.scratch import (
+    acquire_scratch,
+    release_scratch,
+    sweep_orphans,
+    ScratchBudgetExceeded,
+    ScratchTooLarge,
+    SCRATCH_RETRY_DELAY,
+    SCRATCH_MAX_WAIT,
+)
+from ffmpeg.utils.profiling import trace, span, summarize
 
 from pathlib import Path
 from backend.utils.mongo import jobs_col, assets_col
@@ -15,196 +44,567 @@ def update_job_mongo(job_id, fields):
         {"$set": {**fields, "updated_at": datetime.now(timezone.utc)}}
     )
 
-TEMP_DIR = Path("tmp")
-TEMP_DIR.mkdir(exist_ok=True)
+def source_keys(asset_ids, params):
+    """Pipeline steps read their upstream step's output; everything else the raw upload."""
+    return params.get("input_keys") or [f"raw/{asset_id}.mp4" for asset_id in asset_ids]
 
+def step_output_key(params):
+    """Intermediates of a pipeline live under the pipeline, not the asset."""
+    pipeline = params.get("pipeline")
+    return f"pipelines/{pipeline['id']}/{pipeline['step']}.mp4" if pipeline else None
 
-print("Worker started...")
-
-while True:
-    item = redis_client.brpop(JOB_QUEUE, timeout=5)
-    print(item)
-    if not item:
-        continue
-
-    job_id = item[1]
-    job_key = f"job:{job_id}"
-    job = redis_client.hgetall(job_key)
-
-    if not job:
-        continue
-
+def object_size(key):
     try:
-        redis_client.hset(job_key, mapping={"status": JobStatus.processing.value})
-
-        job_type = job["job_type"]
-        asset_ids = json.loads(job["asset_ids"])
-
-        if job_type == JobType.analyze.value:
-            asset_id = asset_ids[0]
-            key = f"raw/{asset_id}.mp4"
-
-            redis_client.hset(job_key, mapping={"step": "analysis", "progress": 20})
-
-            input_url = s3.generate_presigned_url(
-                "get_object",
-                Params={"Bucket": BUCKET_NAME, "Key": key},
-                ExpiresIn=3600,
-            )
-
-            metadata = get_metadata(input_url)
-            redis_client.hset(job_key, mapping={
-                "outputs": json.dumps({"metadata": metadata})
-            })
+        return s3.head_object(Bucket=BUCKET_NAME, Key=key)["ContentLength"]
+    except Exception:
+        return None
 
-            update_job_mongo(job_id, {"status": JobStatus.completed.value, "progress": 100, "outputs": {"metadata": metadata}})
+def object_exists(key):
+    try:
+        s3.head_object(Bucket=BUCKET_NAME, Key=key)
+        return True
+    except Exception:
+        return False
+
+def publish_thumbnails(asset_id, thumb_dir, duration, keyframes):
+    """Upload sprites, WebVTT and keyframe index, and reference them from the asset."""
+    sprites = sorted(p.name for p in Path(thumb_dir).glob("sprite_*.jpg"))
+    if not sprites:
+        raise RuntimeError("Thumbnail generation failed")
+
+    prefix = f"thumbnails/{asset_id}"
+
+    for name in sprites:
+        upload_file(Path(thumb_dir) / name, f"{prefix}/{name}", content_type="image/jpeg")
+
+    vtt_key = f"{prefix}/thumbnails.vtt"
+    s3.put_object(
+        Bucket=BUCKET_NAME, Key=vtt_key,
+        Body=build_thumbnail_vtt(duration, sprites).encode(),
+        ContentType="text/vtt",
+    )
 
-        if job_type == JobType.normalize.value:
-            asset_id = asset_ids[0]
-            key = f"raw/{asset_id}.mp4"
-            output_key = f"normalized/{asset_id}.mp4"
+    keyframes_key = f"{prefix}/keyframes.json"
+    s3.put_object(
+        Bucket=BUCKET_NAME, Key=keyframes_key,
+        Body=json.dumps({"duration": duration, "keyframes": keyframes}).encode(),
+        ContentType="application/json",
+    )
 
-            redis_client.hset(job_key, mapping={
-                "step": "normalize",
-                "progress": 20,
-                "status": JobStatus.processing.value,
-            })
+    thumbnails = {
+        "vtt_key": vtt_key,
+        "keyframes_key": keyframes_key,
+        "sprites": sprites,
+        "interval": THUMB_INTERVAL,
+        "width": THUMB_WIDTH,
+        "height": THUMB_HEIGHT,
+        "columns": SPRITE_COLUMNS,
+        "rows": SPRITE_ROWS,
+        "keyframe_count": len(keyframes),
+    }
+    assets_col.update_one({"_id": asset_id}, {"$set": {"thumbnails": thumbnails}})
+    return thumbnails
+
+def record_job_trace(job_id, job_type, spans):
+    """Persist per-stage timings/resource usage and feed the worker's /metrics."""
+    status = redis_client.hget(f"job:{job_id}", "status") or "unknown"
+    try:
+        jobs_col.update_one(
+            {"_id": job_id},
+            {"$set": {"metrics": {"spans": spans, **summarize(spans)}}}
+        )
+    except Exception as e:
+        print(f"Could not store metrics for job {job_id}: {e}")
+    record_job(job_type, status, spans)
 
-            # generate signed URLs
-            input_url = s3.generate_presigned_url(
-                "get_object",
-                Params={"Bucket": BUCKET_NAME, "Key": key},
-                ExpiresIn=3600,
-            )
+# Jobs that only touch Redis/MinIO metadata need no local space
+NO_SCRATCH_JOB_TYPES = {JobType.analyze.value, JobType.livestream.value, JobType.pipeline.value}
 
-            output_path = TEMP_DIR / f"{asset_id}_normalized.mp4"
+# Queues this worker serves, highest priority first. WORKER_LANES=preview
+# runs a dedicated fast-lane worker that never picks up long encodes.
+LANES = {"preview": PREVIEW_QUEUE, "default": JOB_QUEUE}
 
-            # normalize video
-            success = process_video(input_url, str(output_path))
+def worker_queues():
+    names = [n.strip() for n in setting("WORKER_LANES", "preview,default").split(",") if n.strip()]
+    return [LANES[n] for n in names if n in LANES] or [PREVIEW_QUEUE, JOB_QUEUE]
 
-            if not success:
-                raise RuntimeError("Video normalization failed")
+def main():
+    queues = worker_queues()
+    sweep_orphans()
 
-            redis_client.hset(job_key, mapping={"progress": 70})
+    try:
+        start_metrics_server()
+    except OSError as e:
+        # Another worker on this host already owns the port
+        print(f"Metrics server not started: {e}")
+    start_compactor()
+    print(f"Worker started on {', '.join(queues)}...")
+
+    while True:
+        # BRPOP checks the queues in order, so previews always go first
+        item = redis_client.brpop(queues, timeout=5)
+        print(item)
+        if not item:
+            continue
 
-            # upload to minio
-            s3.upload_file(output_path, BUCKET_NAME, output_key)
+        job_id = item[1]
+        job_key = f"job:{job_id}"
+        job = redis_client.hgetall(job_key)
 
-            redis_client.hset(job_key, mapping={
-                "outputs": json.dumps({"normalized_key": output_key}),
-                "progress": 100,
-                "status": JobStatus.completed.value,
-                "step": "complete",
-            })
+        if not job:
+            continue
 
-            update_job_mongo(job_id, {"status": JobStatus.completed.value, "progress": 100, "outputs": {"normalized_key": output_key}})
-            assets_col.update_one({"_id": asset_id}, {"$set": {"normalized_key": output_key, "status": "normalized"}})
+        work_dir = None
+        scratch_error = None
+        if job.get("job_type") not in NO_SCRATCH_JOB_TYPES:
+            try:
+                keys = source_keys(json.loads(job.get("asset_ids") or "[]"), json.loads(job.get("params") or "{}"))
+                sizes = [object_size(k) for k in keys]
+                # Unknown size (head failed) — acquire_scratch keeps it off tmpfs
+                work_dir = acquire_scratch(job_id, None if None in sizes else sum(sizes))
+            except ScratchTooLarge as e:
+                # Could never run here — fail it below rather than requeue forever
+                scratch_error = e
+            except ScratchBudgetExceeded as e:
+                redis_client.hsetnx(job_key, "scratch_waiting_since", int(time.time()))
+                waiting_since = int(redis_client.hget(job_key, "scratch_waiting_since"))
+                if time.time() - waiting_since > SCRATCH_MAX_WAIT:
+                    scratch_error = ScratchBudgetExceeded(f"{e} for over {SCRATCH_MAX_WAIT}s")
+                else:
+                    # Not a failure — back of the queue until running jobs free space
+                    print(e)
+                    redis_client.lpush(item[0], job_id)
+                    # Previews are small and latency-bound; sleeping here would
+                    # hold up every other preview behind this one
+                    if item[0] != PREVIEW_QUEUE:
+                        time.sleep(SCRATCH_RETRY_DELAY)
+                    continue
+
+        with trace() as spans:
+            try:
+                if scratch_error:
+                    raise scratch_error
+
+                redis_client.hset(job_key, mapping={"status": JobStatus.processing.value})
+
+                job_type = job["job_type"]
+                asset_ids = json.loads(job["asset_ids"])
+                params = json.loads(job.get("params") or "{}")
+                profile = json.loads(job.get("profile") or "null") or DEFAULT_PROFILE
+                # Outputs are cached per asset + encoding settings
+                profile_tag = f"{profile['name']}-{profile_fingerprint(profile)}"
+
+                if job_type == JobType.analyze.value:
+                    key = source_keys(asset_ids, params)[0]
+
+                    redis_client.hset(job_key, mapping={"step": "analysis", "progress": 20})
+
+                    with span("presign"):
+                        input_url = presign_get(key)
+
+                    with span("analysis"):
+                        metadata = get_metadata(input_url)
+                    if not metadata:
+                        raise RuntimeError("Could not probe input")
+
+                    analysis = compact_metadata(metadata)
+
+                    # Full ffprobe JSON lives in Mongo only; Redis gets the compact
+                    # summary unless even that is too big to parse on every poll
+                    update_job_mongo(job_id, {"status": JobStatus.completed.value, "progress": 100,
+                                              "outputs": {"analysis": analysis, "metadata": metadata}})
+
+                    encoded = json.dumps({"analysis": analysis})
+                    if len(encoded) <= REDIS_OUTPUT_LIMIT:
+                        redis_client.hset(job_key, mapping={"outputs": encoded})
+                    else:
+                        redis_client.hset(job_key, mapping={"outputs_in_mongo": 1})
+
+                if job_type == JobType.normalize.value:
+                    asset_id = asset_ids[0]
+                    key = source_keys(asset_ids, params)[0]
+                    # Only a normalize of the raw upload is an asset rendition
+                    is_rendition = not params.get("input_keys")
+                    if is_rendition:
+                        output_key = f"normalized/{asset_id}/{profile_tag}.mp4"
+                    else:
+                        output_key = step_output_key(params)
+
+                    redis_client.hset(job_key, mapping={
+                        "step": "normalize",
+                        "progress": 20,
+                        "status": JobStatus.processing.value,
+                    })
+
+                    output_path = work_dir / "normalized.mp4"
+                    thumb_dir = work_dir / "thumbs" if params.get("thumbnails") else None
+
+                    # Same asset already encoded with identical settings — reuse it
+                    cached = not thumb_dir and object_exists(output_key)
+
+                    if not cached:
+                        # generate signed URLs
+                        with span("presign"):
+                            input_url = presign_get(key)
+
+                        # probe once — used for the frame-rate report and by process_video
+                        with span("probe"):
+                            metadata = get_metadata(input_url)
+                        if not metadata:
+                            raise RuntimeError("Could not probe input")
+
+                        video_stream = next(
+                            (st for st in metadata.get("streams", []) if st.get("codec_type") == "video"), None
+                        )
+                        fps_plan = None
+                        if video_stream:
+                            duration = float(metadata.get("format", {}).get("duration") or 0)
+                            fps_plan = plan_frame_rate(video_stream, profile, duration)
+                            inc("vdo_frames_saved_total", fps_plan.get("frames_saved", 0), policy=fps_plan["policy"])
+
+                        # normalize video (sprites come out of the same decode when requested)
+                        with span("normalize"):
+                            success = process_video(
+                                input_url, str(output_path),
+                                thumbnails_dir=thumb_dir and str(thumb_dir),
+                                profile=profile,
+                                metadata=metadata,
+                            )
+
+                        # A failed encode must never be uploaded under the cache key
+                        if not success or success.returncode != 0:
+                            raise RuntimeError("Video normalization failed")
+
+                        redis_client.hset(job_key, mapping={"progress": 70})
+
+                        # upload to minio
+                        with span("upload") as upload:
+                            upload["bytes"] = output_path.stat().st_size
+                            upload_file(output_path, output_key, content_type="video/mp4")
+
+                    outputs = {"normalized_key": output_key, "output_key": output_key,
+                               "profile": profile["name"], "cached": cached}
+                    if not cached and fps_plan:
+                        outputs["frame_rate"] = fps_plan
+
+                    if thumb_dir:
+                        redis_client.hset(job_key, mapping={"step": "thumbnails", "progress": 85})
+                        with span("thumbnails"):
+                            duration = float(get_metadata(str(output_path))["format"]["duration"])
+                            thumbnails = publish_thumbnails(
+                                asset_id, thumb_dir, duration, get_keyframe_index(str(output_path))
+                            )
+                        outputs["thumbnails_vtt_key"] = thumbnails["vtt_key"]
+
+                    redis_client.hset(job_key, mapping={
+                        "outputs": json.dumps(outputs),
+                        "progress": 100,
+                        "status": JobStatus.completed.value,
+                        "step": "complete",
+                    })
+
+                    update_job_mongo(job_id, {"status": JobStatus.completed.value, "progress": 100, "outputs": outputs})
+                    if is_rendition:
+                        assets_col.update_one({"_id": asset_id}, {"$set": {
+                            "normalized_key": output_key,
+                            f"renditions.{profile['name']}": output_key,
+                            "status": "normalized",
+                        }})
         
-        if job_type == JobType.merge.value:
-            redis_client.hset(job_key, mapping={
-                "step": "merge",
-                "progress": 20,
-                "status": JobStatus.processing.value,
-            })
-
-            if len(asset_ids) < 2:
+                if job_type == JobType.preview.value:
+                    asset_id = asset_ids[0]
+                    key = source_keys(asset_ids, params)[0]
+                    output_key = step_output_key(params) or f"previews/{asset_id}/{profile_tag}.mp4"
+
+                    redis_client.hset(job_key, mapping={
+                        "step": "preview",
+                        "progress": 20,
+                        "status": JobStatus.processing.value,
+                    })
+
+                    cached = object_exists(output_key)
+                    if not cached:
+                        with span("presign"):
+                            input_url = presign_get(key)
+
+                        output_path = work_dir / "preview.mp4"
+                        with span("preview"):
+                            success = generate_preview(
+                                input_url, str(output_path),
+                                profile=profile,
+                                keyframes_only=bool(params.get("keyframes_only")),
+                            )
+
+                        if not success or success.returncode != 0:
+                            raise RuntimeError("Preview generation failed")
+
+                        with span("upload") as upload:
+                            upload["bytes"] = output_path.stat().st_size
+                            upload_file(output_path, output_key, content_type="video/mp4")
+
+                    outputs = {"preview_key": output_key, "output_key": output_key,
+                               "profile": profile["name"], "cached": cached}
+                    redis_client.hset(job_key, mapping={
+                        "outputs": json.dumps(outputs),
+                        "progress": 100,
+                        "status": JobStatus.completed.value,
+                        "step": "complete",
+                    })
+
+                    update_job_mongo(job_id, {"status": JobStatus.completed.value, "progress": 100, "outputs": outputs})
+                    if not params.get("input_keys"):
+                        assets_col.update_one({"_id": asset_id}, {"$set": {"preview_key": output_key}})
+
+                if job_type == JobType.thumbnails.value:
+                    asset_id = asset_ids[0]
+                    key = source_keys(asset_ids, params)[0]
+                    thumb_dir = work_dir / "thumbs"
+
+                    redis_client.hset(job_key, mapping={
+                        "step": "thumbnails",
+                        "progress": 20,
+                        "status": JobStatus.processing.value,
+                    })
+
+                    with span("presign"):
+                        input_url = presign_get(key)
+
+                    with span("thumbnails"):
+                        generate_thumbnails(input_url, str(thumb_dir))
+
+                    redis_client.hset(job_key, mapping={"step": "keyframes", "progress": 70})
+
+                    with span("keyframes"):
+                        metadata = get_metadata(input_url)
+                        duration = float(metadata["format"]["duration"])
+                        keyframes = get_keyframe_index(input_url)
+
+                    with span("upload"):
+                        thumbnails = publish_thumbnails(asset_id, thumb_dir, duration, keyframes)
+
+                    outputs = {"thumbnails_vtt_key": thumbnails["vtt_key"], "keyframes_key": thumbnails["keyframes_key"]}
+                    redis_client.hset(job_key, mapping={
+                        "outputs": json.dumps(outputs),
+                        "progress": 100,
+                        "status": JobStatus.completed.value,
+                        "step": "complete",
+                    })
+
+                    update_job_mongo(job_id, {"status": JobStatus.completed.value, "progress": 100, "outputs": outputs})
+
+                if job_type == JobType.scenes.value:
+                    asset_id = asset_ids[0]
+                    key = source_keys(asset_ids, params)[0]
+
+                    redis_client.hset(job_key, mapping={
+                        "step": "scenes",
+                        "progress": 20,
+                        "status": JobStatus.processing.value,
+                    })
+
+                    with span("presign"):
+                        input_url = presign_get(key)
+
+                    with span("probe"):
+                        metadata = get_metadata(input_url)
+                    if not metadata:
+                        raise RuntimeError("Could not probe input")
+
+                    duration = float(metadata.get("format", {}).get("duration") or 0)
+                    has_audio = any(st.get("codec_type") == "audio" for st in metadata.get("streams", []))
+
+                    with span("scenes"):
+                        scene_index = detect_scenes(input_url, duration, has_audio=has_audio)
+                    if not scene_index:
+                        raise RuntimeError("Scene detection failed")
+
+                    # Columnar arrays on the asset itself — one small doc, not one per scene
+                    assets_col.update_one({"_id": asset_id}, {"$set": {"scene_index": scene_index}})
+
+                    outputs = {"scene_count": scene_index["count"], "duration": duration}
+                    redis_client.hset(job_key, mapping={
+                        "outputs": json.dumps(outputs),
+                        "progress": 100,
+                        "status": JobStatus.completed.value,
+                        "step": "complete",
+                    })
+
+                    update_job_mongo(job_id, {"status": JobStatus.completed.value, "progress": 100, "outputs": outputs})
+
+                if job_type == JobType.match.value:
+                    keys = source_keys(asset_ids, params)
+                    if len(keys) < 2:
+                        raise RuntimeError("Match needs a source and a reference input")
+
+                    redis_client.hset(job_key, mapping={
+                        "step": "match",
+                        "progress": 20,
+                        "status": JobStatus.processing.value,
+                    })
+
+                    # ffmpeg reads both inputs over HTTP — nothing is downloaded
+                    with span("presign"):
+                        source_url, reference_url = presign_get(keys[0]), presign_get(keys[1])
+
+                    output_path = work_dir / "matched.mp4"
+                    with span("match"):
+                        success = apply_broadcast_match(source_url, reference_url, str(output_path), profile=profile)
+
+                    if not success or success.returncode != 0:
+                        raise RuntimeError("Broadcast match failed")
+
+                    output_key = step_output_key(params) or f"matched/{asset_ids[0]}_{asset_ids[1]}/{profile_tag}.mp4"
+                    with span("upload") as upload:
+                        upload["bytes"] = output_path.stat().st_size
+                        upload_file(output_path, output_key, content_type="video/mp4")
+
+                    outputs = {"matched_key": output_key, "output_key": output_key}
+                    redis_client.hset(job_key, mapping={
+                        "outputs": json.dumps(outputs),
+                        "progress": 100,
+                        "status": JobStatus.completed.value,
+                        "step": "complete",
+                    })
+
+                    update_job_mongo(job_id, {"status": JobStatus.completed.value, "progress": 100, "outputs": outputs})
+
+                if job_type == JobType.merge.value:
+                    redis_client.hset(job_key, mapping={
+                        "step": "merge",
+                        "progress": 20,
+                        "status": JobStatus.processing.value,
+                    })
+
+                    keys = source_keys(asset_ids, params)
+                    if len(keys) < 2:
+                        redis_client.hset(job_key, mapping={
+                            "status": JobStatus.failed.value,
+                            "step": "not enough files",
+                            "error": "not enough files",
+                            "progress": 100,
+                        })
+                        # Mongo outlives the Redis hash, so it must see the failure too
+                        update_job_mongo(job_id, {"status": JobStatus.failed.value, "progress": 100,
+                                                  "outputs": {"error": "not enough files"}})
+                        continue
+
+                    local_1 = work_dir / "input_1.mp4"
+                    local_2 = work_dir / "input_2.mp4"
+                    output_path = work_dir / "merged.mp4"
+
+                    # download inputs
+                    with span("download") as download:
+                        download_file(keys[0], local_1)
+                        download_file(keys[1], local_2)
+                        download["bytes"] = local_1.stat().st_size + local_2.stat().st_size
+
+                    redis_client.hset(job_key, mapping={"progress": 40})
+
+                    # get duration for xfade offset
+                    with span("analysis"):
+                        metadata = get_metadata(str(local_1))
+                        duration = float(metadata["format"]["duration"])
+
+                    with span("merge"):
+                        success = merge_videos_with_crossfade(
+                            str(local_1),
+                            str(local_2),
+                            str(output_path),
+                            fade_duration=2,
+                            profile=profile,
+                            work_dir=str(work_dir),
+                        )
+
+                    if not success or success.returncode != 0:
+                        raise RuntimeError("Merge failed")
+
+                    redis_client.hset(job_key, mapping={"progress": 80})
+
+                    output_key = step_output_key(params) or f"merged/{asset_ids[0]}_{asset_ids[1]}/{profile_tag}.mp4"
+                    with span("upload") as upload:
+                        upload["bytes"] = output_path.stat().st_size
+                        upload_file(output_path, output_key, content_type="video/mp4")
+
+                    outputs = {"metadata": {"merged_key": output_key}, "output_key": output_key}
+                    redis_client.hset(job_key, mapping={
+                        "outputs": json.dumps(outputs),
+                        "status": JobStatus.completed.value,
+                        "progress": 100,
+                        "step": "done",
+                    })
+
+                    update_job_mongo(job_id, {"status": JobStatus.completed.value, "progress": 100, "outputs": outputs})
+        
+                if job_type == JobType.livestream.value:
+                    # asset_ids[0] is the RTSP URL for livestream jobs
+                    # (not a MinIO asset — just the camera URL string)
+                    rtsp_url = asset_ids[0]
+
+                    redis_client.hset(job_key, mapping={
+                        "step": "starting_stream",
+                        "progress": 10,
+                        "status": JobStatus.processing.value,
+                    })
+
+                    with span("start_stream"):
+                        result = start_stream(rtsp_url)  # non-blocking — returns immediately
+
+                    # The job is "complete" in the sense that we successfully started the
+                    # stream. The stream itself runs indefinitely in stream_manager.
+                    redis_client.hset(job_key, mapping={
+                        "outputs": json.dumps({
+                            "stream_id": result["stream_id"],
+                            "rtmp_url": result["rtmp_url"],
+                            "hls_preview": result["hls_preview"],
+                        }),
+                        "status": JobStatus.completed.value,
+                        "progress": 100,
+                        "step": "streaming",
+                    })
+
+                    update_job_mongo(job_id, {
+                        "status": JobStatus.completed.value,
+                        "progress": 100,
+                        "outputs": {
+                            "stream_id": result["stream_id"],
+                            "rtmp_url": result["rtmp_url"],
+                            "hls_preview": result["hls_preview"],
+                        },
+                    })
+
+                    # Skip the generic "completed" hset below — already done above
+                    continue
+
                 redis_client.hset(job_key, mapping={
-                    "status": JobStatus.failed.value,
-                    "step": "not enough files",
+                    "status": JobStatus.completed.value,
                     "progress": 100,
+                    "step": "",
                 })
-                continue
-
-            asset_1, asset_2 = asset_ids[:2]
-
-            local_1 = TEMP_DIR / f"{asset_1}.mp4"
-            local_2 = TEMP_DIR / f"{asset_2}.mp4"
-            output_path = TEMP_DIR / f"{asset_1}_{asset_2}_merged.mp4"
-
-            # download inputs
-            s3.download_file(BUCKET_NAME, f"raw/{asset_1}.mp4", str(local_1))
-            s3.download_file(BUCKET_NAME, f"raw/{asset_2}.mp4", str(local_2))
-
-            redis_client.hset(job_key, mapping={"progress": 40})
-
-            # get duration for xfade offset
-            metadata = get_metadata(str(local_1))
-            duration = float(metadata["format"]["duration"])
 
-            success = merge_videos_with_crossfade(
-                str(local_1),
-                str(local_2),
-                str(output_path),
-                fade_duration=2,
-            )
+            except Exception as e:
+                print(e)
+                update_job_mongo(job_id, {"status": JobStatus.failed.value, "progress": 0, "outputs": {"error": str(e)}})
 
-            if not success:
-                raise RuntimeError("Merge failed")
-
-            redis_client.hset(job_key, mapping={"progress": 80})
-
-            output_key = f"merged/{asset_1}_{asset_2}.mp4"
-            s3.upload_file(str(output_path), BUCKET_NAME, output_key)
+                redis_client.hset(job_key, mapping={
+                    "status": JobStatus.failed.value,
+                    "error": str(e),
+                })
 
-            redis_client.hset(job_key, mapping={
-                "outputs": json.dumps({"metadata":{"merged_key": output_key}}),
-                "status": JobStatus.completed.value,
-                "progress": 100,
-                "step": "done",
-            })
+            finally:
+                # Success or failure, nothing of the job stays on local disk
+                release_scratch(work_dir)
+                record_job_trace(job_id, job.get("job_type", "unknown"), spans)
 
-            update_job_mongo(job_id, {"status": JobStatus.completed.value, "progress": 100, "outputs": {"metadata":{"merged_key": output_key}}})
-        
-        if job_type == JobType.livestream.value:
-            # asset_ids[0] is the RTSP URL for livestream jobs
-            # (not a MinIO asset — just the camera URL string)
-            rtsp_url = asset_ids[0]
-
-            redis_client.hset(job_key, mapping={
-                "step": "starting_stream",
-                "progress": 10,
-                "status": JobStatus.processing.value,
-            })
-
-            result = start_stream(rtsp_url)  # non-blocking — returns immediately
-
-            # The job is "complete" in the sense that we successfully started the
-            # stream. The stream itself runs indefinitely in stream_manager.
-            redis_client.hset(job_key, mapping={
-                "outputs": json.dumps({
-                    "stream_id": result["stream_id"],
-                    "rtmp_url": result["rtmp_url"],
-                    "hls_preview": result["hls_preview"],
-                }),
-                "status": JobStatus.completed.value,
-                "progress": 100,
-                "step": "streaming",
-            })
-
-            update_job_mongo(job_id, {
-                "status": JobStatus.completed.value,
-                "progress": 100,
-                "outputs": {
-                    "stream_id": result["stream_id"],
-                    "rtmp_url": result["rtmp_url"],
-                    "hls_preview": result["hls_preview"],
-                },
-            })
-
-            # Skip the generic "completed" hset below — already done above
-            continue
+                pipeline = json.loads(job.get("params") or "{}").get("pipeline")
+                if pipeline:
+                    final = redis_client.hmget(job_key, "status", "error")
+                    try:
+                        advance_pipeline(pipeline["id"], pipeline["step"], final[0], final[1])
+                    except Exception as e:
+                        print(f"Could not advance pipeline {pipeline['id']}: {e}")
 
-        redis_client.hset(job_key, mapping={
-            "status": JobStatus.completed.value,
-            "progress": 100,
-            "step": "",
-        })
+                expire_job(job_key)
 
-    except Exception as e:
-        print(e)
-        update_job_mongo(job_id, {"status": JobStatus.failed.value, "progress": 0, "outputs": {"error": str(e)}})
 
-        redis_client.hset(job_key, mapping={
-            "status": JobStatus.failed.value,
-            "error": str(e),
-        })
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Compare two benchmark result files.
+
+    python -m benchmarks.compare base.json head.json [--threshold 0.10]
+
+Exits non-zero when any case got slower than the threshold (wall time)
+or started failing.
+"""
+import argparse
+import json
+import sys
+
+
+def _index(report):
+    return {(r["name"], r["sample"]): r for r in report["results"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed relative wall-time slowdown")
+    parser.add_argument("--metric", default="wall_s", choices=["wall_s", "cpu_s", "peak_rss_mb"])
+    args = parser.parse_args()
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.head) as f:
+        head = json.load(f)
+
+    print(f"base {base['meta'].get('commit')}  →  head {head['meta'].get('commit')}  ({args.metric})\n")
+
+    base_rows = _index(base)
+    regressions = 0
+
+    for key, row in _index(head).items():
+        before = base_rows.get(key)
+        if not before:
+            continue
+
+        name, sample = key
+        if before["ok"] and not row["ok"]:
+            print(f"FAIL  {name:<22} {sample}")
+            regressions += 1
+            continue
+
+        old, new = before[args.metric], row[args.metric]
+        change = (new - old) / old if old else 0.0
+        flag = "SLOW" if change > args.threshold else "    "
+        if change > args.threshold:
+            regressions += 1
+        print(f"{flag}  {name:<22} {sample:<40} {old:9.2f} → {new:9.2f}  ({change:+.1%})")
+
+    if regressions:
+        print(f"\n{regressions} regression(s) above {args.threshold:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from uuid import uuid4
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+JOB_TIMEOUT = 600  # seconds
+
+
+def run_normalize_job(sample_path, media_duration):
+    """
+    Upload a sample, queue a normalize job and time it through a real
+    worker process until Redis reports it finished.
+
+    Needs Redis, Mongo and a MinIO-compatible S3 endpoint on the
+    addresses in backend.utils (`docker compose up -d`, or local
+    stand-ins such as redis-server + mongod + `moto_server -p 9000`).
+    """
+    from backend.utils.minio import s3, BUCKET_NAME
+    from backend.utils.redis_client import redis_client, JOB_QUEUE
+    from backend.utils.job import create_job, JobType
+
+    try:
+        s3.create_bucket(Bucket=BUCKET_NAME)
+    except Exception:
+        pass  # already exists
+
+    asset_id = f"bench-{uuid4()}"
+    s3.upload_file(str(sample_path), BUCKET_NAME, f"raw/{asset_id}.mp4")
+
+    worker = subprocess.Popen(
+        [sys.executable, "-m", "backend.utils.worker"],
+        cwd=REPO_ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+    start = time.perf_counter()
+    job = create_job([asset_id], job_type=JobType.normalize)
+    redis_client.lpush(JOB_QUEUE, job["job_id"])
+
+    status = None
+    deadline = start + JOB_TIMEOUT
+    while time.perf_counter() < deadline:
+        status = redis_client.hget(f"job:{job['job_id']}", "status")
+        if status in ("completed", "failed"):
+            break
+        time.sleep(0.1)
+    wall = time.perf_counter() - start
+
+    worker.terminate()
+    _, _, usage = os.wait4(worker.pid, 0)
+    worker.returncode = 0  # reaped above
+
+    return {
+        "wall_s": wall,
+        # Worker process + every ffmpeg it waited for
+        "cpu_s": usage.ru_utime + usage.ru_stime,
+        "peak_rss_mb": usage.ru_maxrss / 1024,
+        "realtime_factor": media_duration / wall if wall else None,
+        "ok": status == "completed",
+        "error": None if status == "completed" else f"job status: {status}",
+    }
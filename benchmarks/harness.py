@@ -0,0 +1,50 @@
+import multiprocessing
+import resource
+import time
+import traceback
+
+
+def _child(queue, fn, args, kwargs):
+    start = time.perf_counter()
+    try:
+        result = fn(*args, **kwargs)
+        error = None
+        # ffmpeg helpers return the CompletedProcess instead of raising
+        if getattr(result, "returncode", 0) != 0:
+            error = (result.stderr or "")[-500:] or f"exit code {result.returncode}"
+    except Exception:
+        error = traceback.format_exc(limit=3)
+    wall = time.perf_counter() - start
+
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    queue.put({
+        "wall_s": wall,
+        "cpu_s": own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime,
+        # ru_maxrss is KiB on Linux; the ffmpeg child dominates
+        "peak_rss_mb": max(own.ru_maxrss, children.ru_maxrss) / 1024,
+        "error": error,
+    })
+
+
+def measure(fn, *args, media_duration=None, **kwargs):
+    """
+    Run fn(*args, **kwargs) in a forked process and return wall time, CPU
+    seconds (including ffmpeg children), peak RSS and realtime factor.
+
+    Forking per measurement gives each case its own rusage, so peak RSS
+    is not polluted by earlier cases.
+    """
+    ctx = multiprocessing.get_context("fork")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_child, args=(queue, fn, args, kwargs))
+    proc.start()
+    stats = queue.get()
+    proc.join()
+
+    stats["ok"] = stats["error"] is None and proc.exitcode == 0
+    stats["realtime_factor"] = (
+        media_duration / stats["wall_s"] if media_duration and stats["wall_s"] else None
+    )
+    return stats
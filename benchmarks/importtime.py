@@ -0,0 +1,97 @@
+"""
+Startup-time regression check for the worker and the API.
+
+    python -m benchmarks.importtime [--runs 5] [--scale 1.5]
+
+Imports each entry module in a fresh interpreter under `python -X
+importtime`, takes the best of N runs and fails (exit 1) when the
+cumulative import time exceeds its budget, or when a module that must
+stay lazy (client libraries, numpy/scipy) was imported at all.
+"""
+import argparse
+import json
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+from .run import _git_commit
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Cumulative import time budgets in ms (fastapi/pydantic dominate the API)
+BUDGETS_MS = {
+    "backend.utils.worker": 150,
+    "backend.main": 1500,
+}
+
+# Must only be imported when a client is first used / an analysis needs it
+LAZY_MODULES = ("redis", "pymongo", "boto3", "botocore", "numpy", "scipy")
+
+
+def measure_import(module):
+    """Cumulative import time (ms) of module and the lazy modules it pulled in."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr.splitlines()[-1]}")
+
+    cumulative = None
+    imported = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cum, name = line.split("|")
+        name = name.strip()
+        imported.add(name.split(".")[0])
+        if name == module:
+            cumulative = int(cum) / 1000
+
+    return cumulative, sorted(m for m in LAZY_MODULES if m in imported)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per module (best is kept)")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply budgets, e.g. for slow CI hosts")
+    parser.add_argument("--output", help="also write results JSON here")
+    args = parser.parse_args()
+
+    results = []
+    failed = False
+
+    for module, budget in BUDGETS_MS.items():
+        budget *= args.scale
+        try:
+            runs = [measure_import(module) for _ in range(args.runs)]
+        except RuntimeError as e:
+            print(e)
+            failed = True
+            continue
+
+        best = min(ms for ms, _ in runs)
+        eager = runs[0][1]
+        ok = best <= budget and not eager
+        failed |= not ok
+
+        results.append({"module": module, "import_ms": round(best, 1), "budget_ms": budget, "eager_modules": eager, "ok": ok})
+        print(
+            f"{module:<24} {best:8.1f}ms / {budget:6.0f}ms  "
+            f"{'ok' if ok else 'FAILED'}{'  eager: ' + ', '.join(eager) if eager else ''}"
+        )
+
+    if args.output:
+        output = Path(args.output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps({
+            "meta": {"commit": _git_commit(), "timestamp": datetime.now(timezone.utc).isoformat()},
+            "results": results,
+        }, indent=2))
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
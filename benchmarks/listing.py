@@ -0,0 +1,146 @@
+"""
+Jobs listing on a large seeded collection, with and without the
+listing indexes.
+
+    python -m benchmarks.listing [--docs 1000000] [--pages 20]
+
+Seeds a throwaway database (video_backend_bench) on the Mongo from
+backend.utils.mongo, times first/deep pages for each filter shape and
+records explain() stats — a covered query examines 0 documents.
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from uuid import uuid4
+
+from backend.utils.job import JobStatus, JobType
+from backend.utils.listing import list_page
+from backend.utils.mongo import client, ensure_indexes
+
+from .run import RESULTS_DIR, _git_commit
+
+BENCH_DB = "video_backend_bench"
+SEED_BATCH = 10_000
+PAGE_SIZE = 50
+
+
+def seed(col, count):
+    rng = random.Random(42)
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    statuses = [s.value for s in JobStatus]
+    types = [t.value for t in JobType]
+
+    col.drop()
+    batch = []
+    for i in range(count):
+        batch.append({
+            "_id": str(uuid4()),
+            "job_type": rng.choice(types),
+            "status": rng.choices(statuses, weights=[1, 1, 90, 8])[0],
+            "asset_ids": [f"asset-{rng.randrange(count // 10 or 1)}"],
+            "progress": 100,
+            "outputs": {},
+            # ~1 job per 30 s over the seeded span
+            "created_at": start + timedelta(seconds=i * 30 + rng.random()),
+        })
+        if len(batch) >= SEED_BATCH:
+            col.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        col.insert_many(batch, ordered=False)
+
+
+def _explain(col, filters):
+    query = {k: v for k, v in filters.items() if v is not None}
+    plan = col.find(query, {"status": 1, "job_type": 1, "created_at": 1}) \
+        .sort([("created_at", -1), ("_id", -1)]).limit(PAGE_SIZE).explain()
+    stats = plan.get("executionStats", {})
+    return {
+        "docs_examined": stats.get("totalDocsExamined"),
+        "keys_examined": stats.get("totalKeysExamined"),
+    }
+
+
+def time_pages(col, filters, pages):
+    """Wall time of the first page and of walking `pages` pages deep."""
+    started = time.perf_counter()
+    page = list_page(col, filters, ["status", "job_type"], PAGE_SIZE)
+    first_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    for _ in range(pages - 1):
+        if not page["next_cursor"]:
+            break
+        page = list_page(col, filters, ["status", "job_type"], PAGE_SIZE, page["next_cursor"])
+    deep_ms = (time.perf_counter() - started) * 1000
+
+    return {
+        "first_page_ms": round(first_ms, 2),
+        "per_page_ms": round(deep_ms / max(pages - 1, 1), 2),
+        **_explain(col, filters),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=1_000_000, help="jobs to seed")
+    parser.add_argument("--pages", type=int, default=20, help="pages to walk per query")
+    parser.add_argument("--keep", action="store_true", help="keep the seeded database afterwards")
+    parser.add_argument("--output", help="result JSON path (default: benchmarks/results/listing-<commit>.json)")
+    args = parser.parse_args()
+
+    database = client[BENCH_DB]
+    col = database["jobs"]
+
+    print(f"Seeding {args.docs} jobs...")
+    started = time.perf_counter()
+    seed(col, args.docs)
+    print(f"Seeded in {time.perf_counter() - started:.1f}s")
+
+    shapes = {
+        "all": {},
+        "status": {"status": JobStatus.failed.value},
+        "job_type": {"job_type": JobType.merge.value},
+        "status+job_type": {"status": JobStatus.completed.value, "job_type": JobType.analyze.value},
+    }
+
+    results = []
+    for indexed in (False, True):
+        if indexed:
+            started = time.perf_counter()
+            ensure_indexes(database)
+            print(f"Indexes built in {time.perf_counter() - started:.1f}s")
+
+        for name, filters in shapes.items():
+            row = {"name": f"list_jobs:{name}", "indexed": indexed, **time_pages(col, filters, args.pages)}
+            results.append(row)
+            print(
+                f"{name:<16} indexed={indexed!s:<5} first {row['first_page_ms']:9.2f}ms  "
+                f"per page {row['per_page_ms']:9.2f}ms  docs examined {row['docs_examined']}"
+            )
+
+    if not args.keep:
+        client.drop_database(BENCH_DB)
+
+    commit = _git_commit()
+    report = {
+        "meta": {
+            "commit": commit,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "docs": args.docs,
+            "page_size": PAGE_SIZE,
+        },
+        "results": results,
+    }
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"listing-{commit or 'local'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import os
+import subprocess
+from pathlib import Path
+
+MEDIA_DIR = Path(__file__).resolve().parent / "media"
+
+# (width, height, fps, duration seconds)
+FULL_MATRIX = [
+    (w, h, fps, duration)
+    for (w, h) in [(640, 360), (1280, 720), (1920, 1080), (3840, 2160)]
+    for fps in [25, 30, 60]
+    for duration in [10, 60]
+]
+
+QUICK_MATRIX = [
+    (640, 360, 25, 5),
+    (1280, 720, 30, 5),
+    (1920, 1080, 60, 5),
+]
+
+
+def sample_name(width, height, fps, duration):
+    return f"testsrc_{width}x{height}_{fps}fps_{duration}s.mp4"
+
+
+def generate_sample(width, height, fps, duration, media_dir=MEDIA_DIR):
+    """
+    Deterministic synthetic clip: testsrc video + 440 Hz sine at 48 kHz.
+
+    Bit-exact flags and a single encoder thread keep the file identical
+    across runs, so timings compare like with like. Existing files are
+    reused.
+    """
+    os.makedirs(media_dir, exist_ok=True)
+    path = Path(media_dir) / sample_name(width, height, fps, duration)
+    if path.exists():
+        return path
+
+    command = [
+        "ffmpeg",
+        "-y",
+        "-f", "lavfi",
+        "-i", f"testsrc=size={width}x{height}:rate={fps}:duration={duration}",
+        "-f", "lavfi",
+        "-i", f"sine=frequency=440:sample_rate=48000:duration={duration}",
+        "-c:v", "libx264",
+        "-preset", "ultrafast",
+        "-pix_fmt", "yuv420p",
+        "-threads", "1",
+        "-c:a", "aac",
+        "-shortest",
+        "-map_metadata", "-1",
+        "-fflags", "+bitexact",
+        "-flags:v", "+bitexact",
+        "-flags:a", "+bitexact",
+        str(path),
+    ]
+
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Could not generate {path.name}: {result.stderr[-500:]}")
+
+    return path
@@ -0,0 +1,108 @@
+"""
+Throughput vs quality for each encoding profile.
+
+    python -m benchmarks.profiles [--profiles default,preview] [--quick]
+
+Every profile normalizes the same synthetic clips; quality is SSIM/PSNR
+of the output against the source scaled to the profile's geometry.
+"""
+import argparse
+import json
+import re
+import subprocess
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+from ffmpeg.profiles import BUILTIN_PROFILES
+from ffmpeg.utils.ffmpeg import process_video
+
+from .harness import measure
+from .media import QUICK_MATRIX, generate_sample
+from .run import RESULTS_DIR, _git_commit, _ffmpeg_version
+
+DEFAULT_MATRIX = [(1280, 720, 30, 10), (1920, 1080, 60, 10)]
+
+_SSIM_RE = re.compile(r"SSIM .*All:([\d.]+)")
+_PSNR_RE = re.compile(r"PSNR .*average:([\d.]+|inf)")
+
+
+def measure_quality(encoded, source, profile):
+    """SSIM and PSNR of encoded vs source, compared at the profile's geometry and rate."""
+    width, height, fps = profile["width"], profile["height"], profile["fps"]
+    graph = (
+        f"[1:v]scale={width}:{height}:flags=bicubic:force_original_aspect_ratio=decrease,"
+        f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,fps={fps},format=yuv420p,split[r0][r1];"
+        f"[0:v]format=yuv420p,split[d0][d1];"
+        f"[d0][r0]ssim;[d1][r1]psnr"
+    )
+    result = subprocess.run(
+        ["ffmpeg", "-i", str(encoded), "-i", str(source), "-lavfi", graph, "-f", "null", "-"],
+        capture_output=True, text=True,
+    )
+
+    ssim = _SSIM_RE.search(result.stderr)
+    psnr = _PSNR_RE.search(result.stderr)
+    return {
+        "ssim": float(ssim.group(1)) if ssim else None,
+        "psnr": float(psnr.group(1)) if psnr else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", help="comma-separated builtin profile names (default: all)")
+    parser.add_argument("--quick", action="store_true", help="use the quick 5 s matrix")
+    parser.add_argument("--output", help="result JSON path (default: benchmarks/results/profiles-<commit>.json)")
+    args = parser.parse_args()
+
+    names = args.profiles.split(",") if args.profiles else list(BUILTIN_PROFILES)
+    matrix = QUICK_MATRIX if args.quick else DEFAULT_MATRIX
+    results = []
+
+    with tempfile.TemporaryDirectory(prefix="vdo-bench-") as work_dir:
+        for width, height, fps, duration in matrix:
+            source = generate_sample(width, height, fps, duration)
+
+            for name in names:
+                profile = BUILTIN_PROFILES[name]
+                out = Path(work_dir) / f"{name}_{source.name}"
+
+                stats = measure(process_video, str(source), str(out), profile=profile,
+                                media_duration=duration)
+                quality = measure_quality(out, source, profile) if stats["ok"] else {"ssim": None, "psnr": None}
+                size = out.stat().st_size if out.exists() else None
+
+                row = {
+                    "name": f"profile:{name}",
+                    "sample": source.name,
+                    **stats,
+                    **quality,
+                    "output_bytes": size,
+                    "kbps": round(size * 8 / duration / 1000, 1) if size else None,
+                }
+                results.append(row)
+                print(
+                    f"{name:<10} {source.name:<40} rtf {row['realtime_factor'] or 0:6.2f}x  "
+                    f"cpu {row['cpu_s']:7.2f}s  ssim {row['ssim']}  psnr {row['psnr']}  {row['kbps']} kbps"
+                )
+
+    commit = _git_commit()
+    report = {
+        "meta": {
+            "commit": commit,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "ffmpeg": _ffmpeg_version(),
+            "profiles": {name: BUILTIN_PROFILES[name] for name in names},
+        },
+        "results": results,
+    }
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"profiles-{commit or 'local'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Benchmark the ffmpeg pipeline and job system on synthetic media.
+
+    python -m benchmarks.run --quick
+    python -m benchmarks.run --e2e --output benchmarks/results/mine.json
+    python -m benchmarks.compare base.json mine.json
+"""
+import argparse
+import json
+import platform
+import subprocess
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+from ffmpeg.utils.ffmpeg import (
+    get_metadata,
+    process_video,
+    apply_broadcast_match,
+    merge_videos_with_crossfade,
+)
+
+from .harness import measure
+from .media import FULL_MATRIX, QUICK_MATRIX, generate_sample, sample_name
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+def _git_commit():
+    result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True)
+    return result.stdout.strip() or None
+
+
+def _ffmpeg_version():
+    result = subprocess.run(["ffmpeg", "-version"], capture_output=True, text=True)
+    return result.stdout.split("\n", 1)[0] if result.stdout else None
+
+
+def _record(results, name, sample, stats):
+    row = {"name": name, "sample": sample, **stats}
+    results.append(row)
+
+    status = "ok" if stats["ok"] else "FAILED"
+    rtf = stats.get("realtime_factor")
+    rtf = f"{rtf:6.2f}x" if rtf is not None else "      -"
+    print(
+        f"{name:<22} {sample:<40} {stats['wall_s']:8.2f}s  "
+        f"cpu {stats['cpu_s']:8.2f}s  rss {stats['peak_rss_mb']:7.1f}MB  rtf {rtf}  {status}"
+    )
+
+
+def run_pipeline(matrix, work_dir, results):
+    samples = []
+    for width, height, fps, duration in matrix:
+        samples.append((generate_sample(width, height, fps, duration), duration))
+
+    for path, duration in samples:
+        out = Path(work_dir) / f"norm_{path.name}"
+        _record(results, "get_metadata", path.name,
+                measure(get_metadata, str(path)))
+        _record(results, "process_video", path.name,
+                measure(process_video, str(path), str(out), media_duration=duration))
+
+    # Pairwise steps use consecutive samples, like ffmpeg/main.py does with two clips
+    for (a, duration_a), (b, duration_b) in zip(samples, samples[1:]):
+        pair = f"{a.name}+{b.name}"
+        _record(results, "apply_broadcast_match", pair,
+                measure(apply_broadcast_match, str(a), str(b), str(Path(work_dir) / "matched.mp4"),
+                        media_duration=duration_a))
+        _record(results, "merge_with_crossfade", pair,
+                measure(merge_videos_with_crossfade, str(a), str(b), str(Path(work_dir) / "merged.mp4"),
+                        work_dir=work_dir, media_duration=duration_a + duration_b))
+
+
+def run_e2e(matrix, results):
+    from .e2e import run_normalize_job
+
+    for width, height, fps, duration in matrix:
+        path = generate_sample(width, height, fps, duration)
+        _record(results, "e2e_normalize_job", path.name, run_normalize_job(path, duration))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quick", action="store_true", help="small 5 s matrix instead of the full one")
+    parser.add_argument("--e2e", action="store_true", help="also time the normalize job through Redis/MinIO/worker")
+    parser.add_argument("--output", help="result JSON path (default: benchmarks/results/<commit>.json)")
+    args = parser.parse_args()
+
+    matrix = QUICK_MATRIX if args.quick else FULL_MATRIX
+    commit = _git_commit()
+    results = []
+
+    with tempfile.TemporaryDirectory(prefix="vdo-bench-") as work_dir:
+        run_pipeline(matrix, work_dir, results)
+
+    if args.e2e:
+        run_e2e(matrix, results)
+
+    report = {
+        "meta": {
+            "commit": commit,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "ffmpeg": _ffmpeg_version(),
+            "matrix": [sample_name(*m) for m in matrix],
+        },
+        "results": results,
+    }
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{commit or 'local'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
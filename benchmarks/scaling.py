@@ -0,0 +1,104 @@
+"""
+Scale-filter chain throughput: the old always-lanczos+unsharp chain vs
+the ratio-based plan from plan_scaling.
+
+    python -m benchmarks.scaling [--quick]
+
+Only the video filter graph runs (decode -> filters -> null muxer), so
+the numbers isolate scaling cost from the encoder.
+"""
+import argparse
+import json
+import re
+import subprocess
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from ffmpeg.profiles import DEFAULT_PROFILE
+from ffmpeg.utils.ffmpeg import plan_scaling
+
+from .media import generate_sample
+from .run import RESULTS_DIR, _git_commit, _ffmpeg_version
+
+# 4K downscale, mild upscale, large upscale to the 1080p target
+DEFAULT_MATRIX = [(3840, 2160, 30, 10), (1280, 720, 30, 10), (854, 480, 30, 10)]
+QUICK_MATRIX = [(3840, 2160, 30, 5), (1280, 720, 30, 5)]
+
+_FRAME_RE = re.compile(r"frame=\s*(\d+)")
+
+
+def legacy_filters(profile):
+    width, height = profile["width"], profile["height"]
+    return [
+        f"scale={width}:{height}:flags=lanczos:force_original_aspect_ratio=decrease,"
+        f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,"
+        f"unsharp=9:9:2.0:9:9:0.0,"
+        f"eq=contrast=1.05"
+    ]
+
+
+def run_chain(source, filters):
+    command = ["ffmpeg", "-hide_banner", "-i", str(source), "-an"]
+    if filters:
+        command.extend(["-vf", ",".join(filters)])
+    command.extend(["-f", "null", "-"])
+
+    started = time.perf_counter()
+    result = subprocess.run(command, capture_output=True, text=True)
+    wall = time.perf_counter() - started
+
+    frames = _FRAME_RE.findall(result.stderr)
+    frames = int(frames[-1]) if frames else 0
+    return {
+        "ok": result.returncode == 0,
+        "wall_s": round(wall, 3),
+        "frames": frames,
+        "fps": round(frames / wall, 1) if wall else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quick", action="store_true", help="use the quick 5 s matrix")
+    parser.add_argument("--output", help="result JSON path (default: benchmarks/results/scaling-<commit>.json)")
+    args = parser.parse_args()
+
+    profile = DEFAULT_PROFILE
+    matrix = QUICK_MATRIX if args.quick else DEFAULT_MATRIX
+    results = []
+
+    for width, height, fps, duration in matrix:
+        source = generate_sample(width, height, fps, duration)
+        plan = plan_scaling(width, height, profile)
+
+        for name, filters in (("legacy", legacy_filters(profile)), ("planned", plan["filters"])):
+            row = {
+                "name": f"scaling:{name}",
+                "sample": source.name,
+                "ratio": plan["ratio"],
+                "filters": filters,
+                **run_chain(source, filters),
+            }
+            results.append(row)
+            print(f"{name:<8} {source.name:<40} x{plan['ratio']:<6} {row['fps'] or 0:8.1f} fps  {row['wall_s']:7.2f}s")
+
+    commit = _git_commit()
+    report = {
+        "meta": {
+            "commit": commit,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "ffmpeg": _ffmpeg_version(),
+            "profile": profile,
+        },
+        "results": results,
+    }
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"scaling-{commit or 'local'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
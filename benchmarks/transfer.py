@@ -0,0 +1,149 @@
+"""
+MinIO transfer throughput: botocore defaults vs the tuned transfer layer
+in backend.utils.minio.
+
+    python -m benchmarks.transfer [--size-mb 256] [--parallel 4]
+
+Needs an S3 endpoint on the address in backend.utils.minio — the
+docker-compose MinIO, or a local stand-in such as `moto_server -p 9000`.
+Each mode uploads and downloads `--parallel` files of `--size-mb` at
+once (like that many workers on one host) and reports aggregate MB/s.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from uuid import uuid4
+
+from backend.utils import minio
+
+from .run import RESULTS_DIR, _git_commit
+
+PRESIGN_CALLS = 2000
+
+
+def _default_client():
+    import boto3
+    return boto3.session.Session().client(
+        "s3",
+        endpoint_url=os.getenv("S3_ENDPOINT_URL", "http://localhost:9000"),
+        aws_access_key_id=os.getenv("S3_ACCESS_KEY", "minioadmin"),
+        aws_secret_access_key=os.getenv("S3_SECRET_KEY", "minioadmin"),
+        region_name=os.getenv("S3_REGION", "us-east-1"),
+    )
+
+
+def _run_parallel(fn, items, parallel):
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=parallel) as pool:
+        list(pool.map(fn, items))
+    return time.perf_counter() - started
+
+
+def bench_mode(name, upload, download, sources, work_dir, parallel):
+    keys = [f"bench/transfer/{uuid4()}.bin" for _ in sources]
+    total_mb = sum(p.stat().st_size for p in sources) / 1024 ** 2
+
+    up_s = _run_parallel(lambda pair: upload(*pair), list(zip(sources, keys)), parallel)
+    targets = [Path(work_dir) / f"{name}_{i}.bin" for i in range(len(keys))]
+    down_s = _run_parallel(lambda pair: download(*pair), list(zip(keys, targets)), parallel)
+
+    for key in keys:
+        minio.s3.delete_object(Bucket=minio.BUCKET_NAME, Key=key)
+    for target in targets:
+        target.unlink(missing_ok=True)
+
+    row = {
+        "name": f"transfer:{name}",
+        "files": len(sources),
+        "total_mb": round(total_mb, 1),
+        "upload_mb_s": round(total_mb / up_s, 1),
+        "download_mb_s": round(total_mb / down_s, 1),
+    }
+    print(f"{name:<8} up {row['upload_mb_s']:8.1f} MB/s   down {row['download_mb_s']:8.1f} MB/s")
+    return row
+
+
+def bench_presign():
+    key = "bench/transfer/presign.bin"
+
+    started = time.perf_counter()
+    for _ in range(PRESIGN_CALLS):
+        minio.s3.generate_presigned_url("get_object", Params={"Bucket": minio.BUCKET_NAME, "Key": key}, ExpiresIn=3600)
+    raw_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(PRESIGN_CALLS):
+        minio.presign_get(key)
+    cached_s = time.perf_counter() - started
+
+    row = {
+        "name": "presign",
+        "calls": PRESIGN_CALLS,
+        "uncached_us": round(raw_s / PRESIGN_CALLS * 1e6, 1),
+        "cached_us": round(cached_s / PRESIGN_CALLS * 1e6, 1),
+    }
+    print(f"presign  uncached {row['uncached_us']:.1f} µs/call   cached {row['cached_us']:.1f} µs/call")
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=256, help="size of each test file")
+    parser.add_argument("--parallel", type=int, default=4, help="concurrent transfers")
+    parser.add_argument("--output", help="result JSON path (default: benchmarks/results/transfer-<commit>.json)")
+    args = parser.parse_args()
+
+    try:
+        minio.s3.create_bucket(Bucket=minio.BUCKET_NAME)
+    except Exception:
+        pass  # already exists
+
+    default = _default_client()
+    results = []
+
+    with tempfile.TemporaryDirectory(prefix="vdo-bench-") as work_dir:
+        sources = []
+        for i in range(args.parallel):
+            path = Path(work_dir) / f"source_{i}.bin"
+            with open(path, "wb") as f:
+                for _ in range(args.size_mb):
+                    f.write(os.urandom(1024 ** 2))
+            sources.append(path)
+
+        results.append(bench_mode(
+            "default",
+            lambda path, key: default.upload_file(str(path), minio.BUCKET_NAME, key),
+            lambda key, path: default.download_file(minio.BUCKET_NAME, key, str(path)),
+            sources, work_dir, args.parallel,
+        ))
+        results.append(bench_mode("tuned", minio.upload_file, minio.download_file, sources, work_dir, args.parallel))
+
+    results.append(bench_presign())
+
+    commit = _git_commit()
+    report = {
+        "meta": {
+            "commit": commit,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "size_mb": args.size_mb,
+            "parallel": args.parallel,
+            "multipart_chunksize": minio.S3_MULTIPART_CHUNKSIZE,
+            "max_concurrency": minio.S3_MAX_CONCURRENCY,
+            "max_pool_connections": minio.S3_MAX_POOL_CONNECTIONS,
+        },
+        "results": results,
+    }
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"transfer-{commit or 'local'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
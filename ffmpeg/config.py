@@ -4,4 +4,24 @@ TARGET_WIDTH = 1920
 TARGET_HEIGHT = 1080
 TARGET_FPS = 60
 TARGET_LUFS = -16
-TARGET_SAMPLE_RATE = 48000
\ No newline at end of file
+TARGET_SAMPLE_RATE = 48000
+
+# Scrubbing thumbnails (WebVTT + JPEG sprite sheets)
+THUMB_INTERVAL = 5          # seconds between thumbnails
+THUMB_WIDTH = 160
+THUMB_HEIGHT = 90
+SPRITE_COLUMNS = 10
+SPRITE_ROWS = 10
+
+# Preview proxies (previews/ prefix)
+PREVIEW_MAXRATE = "600k"
+PREVIEW_AUDIO_BITRATE = "64k"
+
+# Sampled signal analysis (broadcast matching)
+SIGNAL_SAMPLE_COUNT = 24    # keyframes analysed per file, whatever its length
+SIGNAL_SAMPLE_WORKERS = 4   # concurrent single-frame decodes
+
+# Scene index
+SCENE_THRESHOLD = 10.0      # scdet score (0-100) that counts as a cut
+SCENE_MIN_DURATION = 0.5    # seconds — closer cuts (flashes, strobes) are merged
+SCENE_ANALYSIS_HEIGHT = 270 # stats/cut detection run on a downscaled copy
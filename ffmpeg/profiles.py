@@ -0,0 +1,227 @@
+# profiles.py — named encoding profiles
+#
+# A profile bundles the target geometry/loudness with encoder settings.
+# Profiles are plain dicts so they can be stored in Mongo as-is and
+# snapshotted into job records.
+
+import hashlib
+import json
+import re
+
+from .config import (
+    TARGET_FPS,
+    TARGET_HEIGHT,
+    TARGET_LUFS,
+    TARGET_SAMPLE_RATE,
+    TARGET_WIDTH
+)
+
+# Presets are spelled differently per encoder; the profile keeps the
+# encoder's own names so nothing is lost in translation.
+X26X_PRESETS = (
+    "ultrafast", "superfast", "veryfast", "faster", "fast",
+    "medium", "slow", "slower", "veryslow",
+)
+CODEC_PRESETS = {
+    "libx264": X26X_PRESETS,
+    "libx265": X26X_PRESETS,
+    "h264_nvenc": ("p1", "p2", "p3", "p4", "p5", "p6", "p7"),
+}
+H264_CODECS = {"libx264", "h264_nvenc"}
+CODEC_PROFILES = {
+    "libx264": ("baseline", "main", "high", "high10", "high422", "high444"),
+    "libx265": ("main", "main10", "main12", "mainstillpicture"),
+    "h264_nvenc": ("baseline", "main", "high", "high444p"),
+}
+LEVELS = (
+    "1", "1b", "1.1", "1.2", "1.3", "2", "2.0", "2.1", "2.2", "3", "3.0", "3.1", "3.2",
+    "4", "4.0", "4.1", "4.2", "5", "5.0", "5.1", "5.2", "6", "6.0", "6.1", "6.2",
+)
+# encoder_args never passes -tune to nvenc, so it takes none
+CODEC_TUNES = {
+    "libx264": ("film", "animation", "grain", "stillimage", "fastdecode", "zerolatency", "psnr", "ssim"),
+    "libx265": ("animation", "grain", "fastdecode", "zerolatency", "psnr", "ssim"),
+    "h264_nvenc": (),
+}
+SAMPLE_RATES = (22050, 32000, 44100, 48000, 96000)
+
+# How "fps" is applied (see plan_frame_rate in utils/ffmpeg.py):
+#   native   — keep the source rate, capped at fps (VFR sources become CFR)
+#   multiple — keep the source rate when fps is an integer multiple of it
+#   target   — always convert to fps
+FPS_POLICIES = ("native", "multiple", "target")
+
+# Scaling (see plan_scaling in utils/ffmpeg.py). "auto" picks by scale ratio.
+SCALERS = ("auto", "fast_bilinear", "bilinear", "bicubic", "area", "lanczos")
+SHARPEN_LEVELS = ("auto", "off", "light", "medium", "strong")
+FIT_MODES = ("letterbox", "crop")
+
+DEFAULT_PROFILE = {
+    "name": "default",
+    "width": TARGET_WIDTH,
+    "height": TARGET_HEIGHT,
+    "fps": TARGET_FPS,
+    "fps_policy": "native",  # duplicating 24/25/30 fps up to 60 doubles encode cost for nothing
+    "scaler": "auto",
+    "sharpen": "auto",       # only ever applied when upscaling
+    "fit": "letterbox",      # letterbox (pad) or crop to the target aspect
+    "lufs": TARGET_LUFS,
+    "sample_rate": TARGET_SAMPLE_RATE,
+    "codec": "libx264",
+    "h264_profile": "main",
+    "level": "4.0",
+    "preset": "veryfast",
+    "tune": None,
+    "crf": 23,
+    "bitrate": None,       # e.g. "4M" — replaces crf when set
+    "threads": None,       # None = let the encoder decide
+}
+
+BUILTIN_PROFILES = {
+    "default": DEFAULT_PROFILE,
+    # Also what preview jobs encode with unless another profile is asked for
+    "preview": {
+        **DEFAULT_PROFILE,
+        "name": "preview",
+        "width": 640,
+        "height": 360,
+        "fps": 30,
+        "scaler": "fast_bilinear",
+        "sharpen": "off",
+        "preset": "ultrafast",
+        "crf": 30,
+    },
+    # Several workers per host: cap x264 threads so jobs don't thrash
+    "packed": {
+        **DEFAULT_PROFILE,
+        "name": "packed",
+        "threads": 2,
+    },
+    "archive": {
+        **DEFAULT_PROFILE,
+        "name": "archive",
+        "h264_profile": "high",
+        "level": "4.2",
+        "preset": "slow",
+        "crf": 18,
+    },
+}
+
+# Fields that change the encoded output (name does not)
+_ENCODING_FIELDS = [k for k in DEFAULT_PROFILE if k != "name"]
+
+_NAME_RE = re.compile(r"^[a-z0-9_-]{1,32}$")
+_BITRATE_RE = re.compile(r"^\d+(\.\d+)?[kM]?$")
+
+
+def _is_int(value):
+    # bool is an int subclass — True would reach argv as "True"
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def validate_profile(profile):
+    """
+    Fill in defaults and check every field. Returns the complete profile;
+    raises ValueError describing the first problem found.
+    """
+    unknown = set(profile) - set(DEFAULT_PROFILE) - {"_id"}
+    if unknown:
+        raise ValueError(f"Unknown profile fields: {sorted(unknown)}")
+
+    merged = {**DEFAULT_PROFILE, **{k: v for k, v in profile.items() if k != "_id"}}
+
+    if not isinstance(merged["name"], str) or not _NAME_RE.match(merged["name"]):
+        raise ValueError("name must be 1-32 chars of a-z, 0-9, _ or -")
+
+    for field, upper in (("width", 7680), ("height", 4320)):
+        value = merged[field]
+        if not _is_int(value) or not 16 <= value <= upper or value % 2:
+            raise ValueError(f"{field} must be an even integer between 16 and {upper}")
+
+    if not _is_number(merged["fps"]) or not 1 <= merged["fps"] <= 240:
+        raise ValueError("fps must be between 1 and 240")
+
+    if merged["fps_policy"] not in FPS_POLICIES:
+        raise ValueError(f"fps_policy must be one of {FPS_POLICIES}")
+
+    for field, allowed in (("scaler", SCALERS), ("sharpen", SHARPEN_LEVELS), ("fit", FIT_MODES)):
+        if merged[field] not in allowed:
+            raise ValueError(f"{field} must be one of {allowed}")
+
+    if not _is_number(merged["lufs"]) or not -70 <= merged["lufs"] <= 0:
+        raise ValueError("lufs must be between -70 and 0")
+
+    if not _is_int(merged["sample_rate"]) or merged["sample_rate"] not in SAMPLE_RATES:
+        raise ValueError(f"sample_rate must be one of {SAMPLE_RATES}")
+
+    codec = merged["codec"]
+    if codec not in CODEC_PRESETS:
+        raise ValueError(f"codec must be one of {sorted(CODEC_PRESETS)}")
+
+    if merged["preset"] not in CODEC_PRESETS[codec]:
+        raise ValueError(f"preset for {codec} must be one of {CODEC_PRESETS[codec]}")
+
+    # These go into argv verbatim, so they must be strings ffmpeg knows
+    if not isinstance(merged["h264_profile"], str) or merged["h264_profile"] not in CODEC_PROFILES[codec]:
+        raise ValueError(f"h264_profile for {codec} must be one of {CODEC_PROFILES[codec]}")
+
+    if not isinstance(merged["level"], str) or merged["level"] not in LEVELS:
+        raise ValueError(f"level must be one of {LEVELS}")
+
+    if merged["tune"] is not None and merged["tune"] not in CODEC_TUNES[codec]:
+        raise ValueError(f"tune for {codec} must be null or one of {CODEC_TUNES[codec]}")
+
+    if merged["bitrate"] is not None:
+        if not isinstance(merged["bitrate"], str) or not _BITRATE_RE.match(merged["bitrate"]):
+            raise ValueError("bitrate must look like '4M' or '2500k'")
+        merged["crf"] = None
+    elif not _is_int(merged["crf"]) or not 0 <= merged["crf"] <= 51:
+        raise ValueError("crf must be an integer between 0 and 51 (or set bitrate)")
+
+    if merged["threads"] is not None and (not _is_int(merged["threads"]) or not 0 <= merged["threads"] <= 64):
+        raise ValueError("threads must be an integer between 0 and 64")
+
+    return merged
+
+
+def profile_fingerprint(profile):
+    """Short stable hash of the encoding settings, for output cache keys."""
+    canonical = json.dumps({k: profile.get(k) for k in _ENCODING_FIELDS}, sort_keys=True)
+    return hashlib.sha1(canonical.encode()).hexdigest()[:10]
+
+
+def encoder_args(profile, tune=None):
+    """The -c:v ... block shared by every encode in the pipeline."""
+    codec = profile["codec"]
+    args = ["-c:v", codec]
+
+    if codec in H264_CODECS:
+        args.extend([
+            "-profile:v", profile["h264_profile"],
+            "-level", profile["level"],
+        ])
+
+    args.extend([
+        "-pix_fmt", "yuv420p",
+        "-preset", profile["preset"],
+    ])
+
+    tune = tune or profile.get("tune")
+    if tune and codec != "h264_nvenc":
+        args.extend(["-tune", tune])
+
+    if profile.get("bitrate"):
+        args.extend(["-b:v", profile["bitrate"]])
+    elif codec == "h264_nvenc":
+        args.extend(["-rc", "vbr", "-cq", str(profile["crf"])])
+    else:
+        args.extend(["-crf", str(profile["crf"])])
+
+    if profile.get("threads") is not None:
+        args.extend(["-threads", str(profile["threads"])])
+
+    return args
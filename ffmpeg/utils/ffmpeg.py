@@ -1,28 +1,36 @@
-import subprocess
 import json
-import numpy as np
-from scipy.signal import correlate
-import wave
+import math
+import os
+import statistics
+import tempfile
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
 
 from ..config import (
-    TARGET_FPS,
-    TARGET_HEIGHT,
-    TARGET_LUFS,
-    TARGET_SAMPLE_RATE,
-    TARGET_WIDTH
+    THUMB_INTERVAL,
+    THUMB_WIDTH,
+    THUMB_HEIGHT,
+    SPRITE_COLUMNS,
+    SPRITE_ROWS,
+    SIGNAL_SAMPLE_COUNT,
+    SIGNAL_SAMPLE_WORKERS,
+    SCENE_THRESHOLD,
+    SCENE_MIN_DURATION,
+    SCENE_ANALYSIS_HEIGHT,
+    PREVIEW_MAXRATE,
+    PREVIEW_AUDIO_BITRATE
 )
+from ..profiles import DEFAULT_PROFILE, BUILTIN_PROFILES, encoder_args
+from .profiling import run_profiled
 
 # -------------------------------------------------
 # Core Command Runner
 # -------------------------------------------------
 
 def run_command(command):
-    result = subprocess.run(
-        command,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True
-    )
+    # Records a profiling span (CPU, max RSS, I/O, speed) when tracing
+    result = run_profiled(command)
 
     if result.returncode != 0:
         print("FFmpeg Error:")
@@ -47,7 +55,7 @@ def get_metadata(video_path):
         video_path
     ]
 
-    result = subprocess.run(command, capture_output=True, text=True)
+    result = run_profiled(command)
 
     if not result.stdout:
         return None
@@ -59,7 +67,7 @@ def get_metadata(video_path):
 # Signal Statistics (Broadcast Matching)
 # -------------------------------------------------
 
-import re
+SIGNAL_KEYS = ("YAVG", "YLOW", "YHIGH")
 
 def get_signal_stats(video_path):
 
@@ -72,28 +80,125 @@ def get_signal_stats(video_path):
     "-"
 ]
 
-    result = subprocess.run(command, capture_output=True, text=True)
-    output = result.stderr
+    result = run_profiled(command)
+    frames = _parse_signalstats(result.stderr)
+
+    stats = {}
+    for key in SIGNAL_KEYS:
+        values = [f[key] for f in frames if key in f]
+        stats[key] = sum(values)/len(values) if values else 0
+
+    return stats
 
-    y_avg = []
-    y_low = []
-    y_high = []
+
+def _parse_signalstats(output):
+    """Per-frame {pts_time, YAVG, YLOW, YHIGH} from metadata=print output."""
+    frames = []
+    current = None
 
     for line in output.split("\n"):
 
-        if "lavfi.signalstats.YAVG" in line:
-            y_avg.append(float(line.split("=")[-1]))
+        if "pts_time:" in line:
+            current = {"pts_time": float(line.split("pts_time:")[-1].split()[0])}
+            frames.append(current)
+            continue
+
+        for key in SIGNAL_KEYS:
+            if f"lavfi.signalstats.{key}=" in line:
+                if current is None:
+                    current = {}
+                    frames.append(current)
+                current[key] = float(line.split("=")[-1])
+
+    return frames
+
+
+def _sample_keyframe_stats(video_path, timestamp):
+    # Input-side seek lands on the keyframe at or before timestamp, and
+    # nokey makes the decoder drop everything else — one frame per call
+    command = [
+        "ffmpeg",
+        "-skip_frame", "nokey",
+        "-noaccurate_seek",
+        "-ss", f"{timestamp:.3f}",
+        "-i", video_path,
+        "-an", "-sn", "-dn",
+        "-frames:v", "1",
+        "-threads", "1",
+        "-vf", "signalstats,metadata=print",
+        "-f", "null",
+        "-"
+    ]
+
+    result = run_profiled(command, name="signalstats_sample")
+    frames = _parse_signalstats(result.stderr)
+
+    if not frames or not all(k in frames[0] for k in SIGNAL_KEYS):
+        return None
+
+    # Without -copyts pts_time is relative to the seek point (negative when
+    # the keyframe sits before it), so shift it back onto the file timeline
+    frame = dict(frames[0])
+    frame["pts_time"] = round(timestamp + frame.get("pts_time", 0.0), 3)
+    return frame
+
+
+def _distribution(values):
+    ordered = sorted(values)
+    deciles = statistics.quantiles(ordered, n=10, method="inclusive") if len(ordered) > 1 else ordered * 9
+
+    return {
+        "mean": round(statistics.fmean(ordered), 3),
+        "median": round(statistics.median(ordered), 3),
+        "stdev": round(statistics.pstdev(ordered), 3),
+        "min": ordered[0],
+        "p10": round(deciles[0], 3),
+        "p90": round(deciles[-1], 3),
+        "max": ordered[-1],
+    }
+
+
+def get_sampled_signal_stats(video_path, samples=SIGNAL_SAMPLE_COUNT, duration=None, workers=SIGNAL_SAMPLE_WORKERS):
+    """Whole-file signal stats from evenly spaced keyframes; medians under YAVG/YLOW/YHIGH."""
+    if duration is None:
+        metadata = get_metadata(video_path)
+        duration = float(metadata["format"].get("duration", 0)) if metadata else 0
+
+    if not duration or duration <= 0:
+        # Unknown length (e.g. a raw stream) — fall back to the head scan
+        return get_signal_stats(video_path)
 
-        if "lavfi.signalstats.YLOW" in line:
-            y_low.append(float(line.split("=")[-1]))
+    step = duration / samples
+    timestamps = [step * (i + 0.5) for i in range(samples)]
 
-        if "lavfi.signalstats.YHIGH" in line:
-            y_high.append(float(line.split("=")[-1]))
+    # Each task gets its own context copy so run_profiled's spans still
+    # land in the caller's trace
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(copy_context().run, _sample_keyframe_stats, video_path, t)
+            for t in timestamps
+        ]
+        results = [f.result() for f in futures]
+
+    # Short files with long GOPs can map several timestamps onto the same
+    # keyframe — pts_time is absolute here, so it identifies the keyframe
+    frames = {}
+    for frame in results:
+        if frame is not None:
+            frames.setdefault(frame["pts_time"], frame)
+    frames = list(frames.values())
+
+    if not frames:
+        return get_signal_stats(video_path)
+
+    distribution = {key: _distribution([f[key] for f in frames]) for key in SIGNAL_KEYS}
 
     return {
-        "YAVG": sum(y_avg)/len(y_avg) if y_avg else 0,
-        "YLOW": sum(y_low)/len(y_low) if y_low else 0,
-        "YHIGH": sum(y_high)/len(y_high) if y_high else 0,
+        **{key: distribution[key]["median"] for key in SIGNAL_KEYS},
+        "distribution": distribution,
+        "samples": len(frames),
+        "requested_samples": samples,
+        "timestamps": sorted(f["pts_time"] for f in frames),
     }
 
 def compute_matching_params(statsA, statsB):
@@ -114,13 +219,16 @@ def compute_matching_params(statsA, statsB):
         "contrast": contrast_scale
     }
 
-def apply_broadcast_match(videoA, videoB, output_path):
+def apply_broadcast_match(videoA, videoB, output_path, profile=DEFAULT_PROFILE, analysis="sampled"):
+
+    # "sampled" looks at keyframes across the whole file, "head" at the first 5 s
+    analyze = get_sampled_signal_stats if analysis == "sampled" else get_signal_stats
 
     print("Analyzing source video...")
-    statsA = get_signal_stats(videoA)
+    statsA = analyze(videoA)
 
     print("Analyzing reference video...")
-    statsB = get_signal_stats(videoB)
+    statsB = analyze(videoB)
 
     print("Stats A:", statsA)
     print("Stats B:", statsB)
@@ -142,12 +250,7 @@ def apply_broadcast_match(videoA, videoB, output_path):
         "-filter_complex", filter_string,
         "-map", "[v]",
         "-map", "0:a?",
-        "-c:v", "libx264",
-        "-profile:v", "main",
-        "-level", "4.0",
-        "-pix_fmt", "yuv420p",
-        "-preset", "veryfast",
-        "-crf", "23",
+        *encoder_args(profile),
         "-movflags", "+faststart",
         "-c:a", "copy",
         output_path
@@ -156,13 +259,171 @@ def apply_broadcast_match(videoA, videoB, output_path):
     return run_command(command)
 
 
+# -------------------------------------------------
+# Frame-Rate Policy
+# -------------------------------------------------
+
+# Standard rates VFR sources are snapped to when made constant
+STANDARD_RATES = (23.976, 24, 25, 29.97, 30, 48, 50, 59.94, 60, 120)
+# Relative tolerance for "same rate" / "integer multiple" checks (29.97 vs 30)
+RATE_TOLERANCE = 0.005
+
+
+def parse_rate(rate_string):
+    try:
+        num, den = str(rate_string).split("/")
+        return float(num) / float(den) if float(den) != 0 else 0
+    except (ValueError, ZeroDivisionError):
+        try:
+            return float(rate_string)
+        except ValueError:
+            return 0
+
+
+def _rate_expr(rate):
+    # NTSC rates as exact fractions so fps= doesn't drift
+    if abs(rate * 1.001 - round(rate * 1.001)) < 0.01 and rate % 1:
+        return f"{round(rate * 1.001) * 1000}/1001"
+    return f"{rate:g}"
+
+
+def _same_rate(a, b):
+    return a > 0 and b > 0 and abs(a - b) / b <= RATE_TOLERANCE
+
+
+def plan_frame_rate(video_stream, profile=DEFAULT_PROFILE, duration=None):
+    """Output frame rate under the profile's fps_policy (VFR sources become CFR), plus frames saved."""
+    target = float(profile["fps"])
+    policy = profile.get("fps_policy", "target")
+
+    base = parse_rate(video_stream.get("r_frame_rate", "0/0"))
+    avg = parse_rate(video_stream.get("avg_frame_rate", "0/0"))
+    vfr = base > 0 and avg > 0 and not _same_rate(base, avg)
+
+    # What the viewer actually gets from the source
+    native = avg if vfr else (base or avg)
+    if vfr:
+        native = min(STANDARD_RATES, key=lambda r: abs(r - native))
+
+    if not native:
+        # Unknown source rate — the only safe choice is the target
+        output = target
+    elif policy == "native":
+        output = min(native, target)
+    elif policy == "multiple":
+        ratio = target / native
+        output = native if native <= target and abs(ratio - round(ratio)) <= RATE_TOLERANCE * ratio else target
+    else:
+        output = target
+
+    needs_filter = vfr or not _same_rate(output, native or 0)
+
+    plan = {
+        "policy": policy,
+        "source_fps": round(base, 3),
+        "avg_fps": round(avg, 3),
+        "vfr": vfr,
+        "output_fps": round(output, 3),
+        "filter": f"fps={_rate_expr(round(output, 3))}" if needs_filter else None,
+        # Versus the old behaviour of always encoding at the profile fps
+        "frames_saved_per_s": round(max(target - output, 0), 3),
+        "encode_saving": round(max(1 - output / target, 0), 3),
+    }
+    if duration:
+        plan["frames_saved"] = int(plan["frames_saved_per_s"] * duration)
+
+    return plan
+
+
+# -------------------------------------------------
+# Scaling Plan
+# -------------------------------------------------
+
+SHARPEN_KERNELS = {
+    "light": "unsharp=5:5:0.5:5:5:0.0",
+    "medium": "unsharp=5:5:1.0:5:5:0.0",
+    # The original always-on kernel — by far the hottest filter at 1080p
+    "strong": "unsharp=9:9:2.0:9:9:0.0",
+}
+# Scale factor above which an upscale counts as "large"
+LARGE_UPSCALE = 1.5
+
+
+def plan_scaling(width, height, profile=DEFAULT_PROFILE):
+    """Scale filter chain picked from the input/target size ratio; profile scaler/sharpen/fit override."""
+    target_width = profile["width"]
+    target_height = profile["height"]
+    fit = profile.get("fit", "letterbox")
+
+    plan = {"ratio": 1.0, "direction": "same", "scaler": None, "sharpen": "off", "fit": fit, "filters": []}
+
+    if not width or not height or (width == target_width and height == target_height):
+        return plan
+
+    # Letterbox fits inside the target, crop covers it
+    ratios = (target_width / width, target_height / height)
+    ratio = min(ratios) if fit == "letterbox" else max(ratios)
+    plan["ratio"] = round(ratio, 3)
+    plan["direction"] = "down" if ratio < 1 else "up" if ratio > 1 else "same"
+
+    scaler = profile.get("scaler", "auto")
+    if scaler == "auto":
+        if ratio <= 0.5:
+            scaler = "area"
+        elif ratio <= LARGE_UPSCALE:
+            scaler = "bicubic"
+        else:
+            scaler = "lanczos"
+
+    sharpen = profile.get("sharpen", "auto")
+    if ratio <= 1:
+        sharpen = "off"
+    elif sharpen == "auto":
+        sharpen = "light" if ratio <= LARGE_UPSCALE else "medium"
+
+    if fit == "crop":
+        filters = [
+            f"scale={target_width}:{target_height}:flags={scaler}:force_original_aspect_ratio=increase",
+            f"crop={target_width}:{target_height}",
+        ]
+    else:
+        filters = [
+            f"scale={target_width}:{target_height}:flags={scaler}:force_original_aspect_ratio=decrease",
+            f"pad={target_width}:{target_height}:(ow-iw)/2:(oh-ih)/2",
+        ]
+
+    if sharpen != "off":
+        filters.append(SHARPEN_KERNELS[sharpen])
+        # Upscaled footage looks flat next to native material
+        filters.append("eq=contrast=1.05")
+
+    plan.update({"scaler": scaler, "sharpen": sharpen, "filters": filters})
+    return plan
+
+
 # -------------------------------------------------
 # Main Normalization Engine (NO COLOR GRADING HERE)
 # -------------------------------------------------
 
-def process_video(input_path, output_path):
+def plan_video_filters(video_stream, profile=DEFAULT_PROFILE):
+    """Scale + frame-rate + pixel-format chain for one video stream."""
+    width = int(video_stream.get("width", 0))
+    height = int(video_stream.get("height", 0))
+
+    filters = list(plan_scaling(width, height, profile)["filters"])
+
+    fps_plan = plan_frame_rate(video_stream, profile)
+    if fps_plan["filter"]:
+        filters.append(fps_plan["filter"])
+
+    filters.append("format=yuv420p")
+    return filters
+
 
-    metadata = get_metadata(input_path)
+def process_video(input_path, output_path, thumbnails_dir=None, profile=DEFAULT_PROFILE, metadata=None):
+
+    # Callers that already probed (for reporting) can pass the result in
+    metadata = metadata or get_metadata(input_path)
     if not metadata:
         print("Invalid metadata")
         return
@@ -179,37 +440,14 @@ def process_video(input_path, output_path):
     video_filters = []
     audio_filters = []
 
-    # Resolution
+    # Resolution / FPS
     if video_stream:
-        width = int(video_stream.get("width", 0))
-        height = int(video_stream.get("height", 0))
-
-        if width != TARGET_WIDTH or height != TARGET_HEIGHT:
-            video_filters.append(
-                f"scale={TARGET_WIDTH}:{TARGET_HEIGHT}:flags=lanczos:"
-                f"force_original_aspect_ratio=decrease,"
-                f"pad={TARGET_WIDTH}:{TARGET_HEIGHT}:(ow-iw)/2:(oh-ih)/2,"
-                f"unsharp=9:9:2.0:9:9:0.0,"
-                f"eq=contrast=1.05"
-            )
-
-        # FPS
-        fps_string = video_stream.get("r_frame_rate", "0/0")
-        try:
-            num, den = fps_string.split("/")
-            fps = float(num) / float(den) if float(den) != 0 else 0
-        except:
-            fps = 0
-
-        if round(fps) != TARGET_FPS:
-            video_filters.append(f"fps={TARGET_FPS}")
-
-        video_filters.append("format=yuv420p")
+        video_filters.extend(plan_video_filters(video_stream, profile))
 
     # Audio
     if audio_stream:
         audio_filters.append("afftdn")
-        audio_filters.append(f"loudnorm=I={TARGET_LUFS}:LRA=11:TP=-1.5")
+        audio_filters.append(f"loudnorm=I={profile['lufs']}:LRA=11:TP=-1.5")
         audio_filters.append("alimiter")
         
 
@@ -219,25 +457,79 @@ def process_video(input_path, output_path):
         "-i", input_path
     ]
 
-    if video_filters:
+    # Sprite sheets as a side output of the same decode
+    with_thumbnails = bool(thumbnails_dir and video_filters)
+
+    if with_thumbnails:
+        command.extend([
+            "-filter_complex",
+            f"[0:v]{','.join(video_filters)},split=2[vout][tsrc];"
+            f"[tsrc]{thumbnail_filter()}[thumbs]",
+            "-map", "[vout]",
+            "-map", "0:a?",
+        ])
+    elif video_filters:
         command.extend(["-vf", ",".join(video_filters)])
 
     if audio_filters:
         command.extend(["-af", ",".join(audio_filters)])
 
     command.extend([
-        "-ar", str(TARGET_SAMPLE_RATE),
-        "-c:v", "libx264",
-        "-profile:v", "main",
-        "-level", "4.0",
-        "-pix_fmt", "yuv420p",
-        "-preset", "veryfast",
-        "-crf", "23",
+        "-ar", str(profile["sample_rate"]),
+        *encoder_args(profile),
         "-movflags", "+faststart",
         "-c:a", "aac",
         output_path
     ])
 
+    if with_thumbnails:
+        os.makedirs(thumbnails_dir, exist_ok=True)
+        command.extend(sprite_output_args(thumbnails_dir))
+
+    return run_command(command)
+
+
+# -------------------------------------------------
+# Preview Proxy
+# -------------------------------------------------
+
+def generate_preview(input_path, output_path, profile=BUILTIN_PROFILES["preview"], metadata=None,
+                     keyframes_only=False):
+    """Low-res proxy for instant playback; skips non-reference frames (keyframes_only: all but keyframes)."""
+    metadata = metadata or get_metadata(input_path)
+    if not metadata:
+        print("Invalid metadata")
+        return
+
+    streams = metadata.get("streams", [])
+    video_stream = next((st for st in streams if st.get("codec_type") == "video"), None)
+    has_audio = any(st.get("codec_type") == "audio" for st in streams)
+    if not video_stream:
+        print("No video stream")
+        return
+
+    gop = max(int(profile["fps"] * 2), 1)
+
+    command = [
+        "ffmpeg",
+        "-y",
+        "-skip_frame", "nokey" if keyframes_only else "noref",
+        "-skip_loop_filter", "all",
+        "-i", input_path,
+        "-vf", ",".join(plan_video_filters(video_stream, profile)),
+        *encoder_args(profile, tune="fastdecode"),
+        "-maxrate", PREVIEW_MAXRATE,
+        "-bufsize", PREVIEW_MAXRATE,
+        "-g", str(gop),
+    ]
+
+    if has_audio:
+        command.extend(["-c:a", "aac", "-b:a", PREVIEW_AUDIO_BITRATE, "-ac", "2"])
+    else:
+        command.append("-an")
+
+    command.extend(["-movflags", "+faststart", output_path])
+
     return run_command(command)
 
 
@@ -245,16 +537,25 @@ def process_video(input_path, output_path):
 # Crossfade Merge
 # -------------------------------------------------
 
-def merge_videos_with_crossfade(video1, video2, output_path, fade_duration=2):
+def merge_videos_with_crossfade(video1, video2, output_path, fade_duration=2, profile=DEFAULT_PROFILE, work_dir=None):
+
+    # concat needs both sides at the same rate
+    profile = {**profile, "fps_policy": "target"}
 
-    temp_1 = process_video(video1,"vid1.mp4")
-    temp_2 = process_video(video2,"vid2.mp4")
+    # Intermediates next to the output (the job's scratch dir in the worker),
+    # never the current directory — concurrent merges would overwrite each other
+    work_dir = work_dir or os.path.dirname(os.path.abspath(output_path))
+    temp_1 = os.path.join(work_dir, "merge_part_1.mp4")
+    temp_2 = os.path.join(work_dir, "merge_part_2.mp4")
+
+    process_video(video1, temp_1, profile=profile)
+    process_video(video2, temp_2, profile=profile)
 
     command = [
         "ffmpeg",
         "-y",
-        "-i", "vid1.mp4",
-        "-i", "vid2.mp4",
+        "-i", temp_1,
+        "-i", temp_2,
         "-filter_complex",
         (
             f"[0:a][1:a]acrossfade=d={fade_duration}:c1=exp:c2=exp[aout];"
@@ -262,16 +563,272 @@ def merge_videos_with_crossfade(video1, video2, output_path, fade_duration=2):
         ),
         "-map", "[vout]",
         "-map", "[aout]",
-        "-c:v", "libx264",
-        "-profile:v", "main",
-        "-level", "4.0",
-        "-pix_fmt", "yuv420p",
-        "-preset", "veryfast",
-        "-crf", "23",
+        *encoder_args(profile),
         "-movflags", "+faststart",
         "-c:a", "aac",
         "-b:a", "192k",
         output_path
     ]
 
-    return run_command(command) 
\ No newline at end of file
+    try:
+        return run_command(command)
+    finally:
+        for temp in (temp_1, temp_2):
+            if os.path.exists(temp):
+                os.remove(temp)
+
+
+# -------------------------------------------------
+# Thumbnails & Keyframe Index
+# -------------------------------------------------
+
+def thumbnail_filter(interval=THUMB_INTERVAL):
+    return (
+        f"fps=1/{interval},"
+        f"scale={THUMB_WIDTH}:{THUMB_HEIGHT}:force_original_aspect_ratio=decrease,"
+        f"pad={THUMB_WIDTH}:{THUMB_HEIGHT}:(ow-iw)/2:(oh-ih)/2,"
+        f"tile={SPRITE_COLUMNS}x{SPRITE_ROWS}"
+    )
+
+
+def sprite_output_args(thumbnails_dir):
+    return [
+        "-map", "[thumbs]",
+        "-an",
+        "-q:v", "5",
+        "-f", "image2",
+        os.path.join(thumbnails_dir, "sprite_%03d.jpg"),
+    ]
+
+
+def generate_thumbnails(input_path, thumbnails_dir, interval=THUMB_INTERVAL):
+    """Standalone sprite pass for assets that were not normalized with thumbnails."""
+
+    os.makedirs(thumbnails_dir, exist_ok=True)
+
+    command = [
+        "ffmpeg",
+        "-y",
+        "-i", input_path,
+        "-filter_complex", f"[0:v]{thumbnail_filter(interval)}[thumbs]",
+    ] + sprite_output_args(thumbnails_dir)
+
+    return run_command(command)
+
+
+def get_keyframe_index(video_path):
+    """
+    Keyframe timestamps of the first video stream, read from packet flags
+    so nothing is decoded.
+    """
+    command = [
+        "ffprobe",
+        "-v", "error",
+        "-select_streams", "v:0",
+        "-show_entries", "packet=pts_time,flags",
+        "-of", "csv=p=0",
+        video_path
+    ]
+
+    result = run_profiled(command)
+
+    keyframes = []
+    for line in result.stdout.splitlines():
+        parts = line.split(",")
+        if len(parts) < 2 or "K" not in parts[1]:
+            continue
+        try:
+            keyframes.append(round(float(parts[0]), 3))
+        except ValueError:
+            continue
+
+    return sorted(keyframes)
+
+
+def _vtt_timestamp(seconds):
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    return f"{int(hours):02d}:{int(minutes):02d}:{secs:06.3f}"
+
+
+def build_thumbnail_vtt(duration, sprite_names, interval=THUMB_INTERVAL):
+    """
+    WebVTT cues mapping each interval to its tile in the sprite sheets
+    (`sprite_001.jpg#xywh=x,y,w,h`).
+    """
+    per_sheet = SPRITE_COLUMNS * SPRITE_ROWS
+    count = min(math.ceil(duration / interval), len(sprite_names) * per_sheet)
+
+    lines = ["WEBVTT", ""]
+    for i in range(count):
+        start = i * interval
+        end = min((i + 1) * interval, duration)
+        sheet, pos = divmod(i, per_sheet)
+        x = (pos % SPRITE_COLUMNS) * THUMB_WIDTH
+        y = (pos // SPRITE_COLUMNS) * THUMB_HEIGHT
+
+        lines.append(f"{_vtt_timestamp(start)} --> {_vtt_timestamp(end)}")
+        lines.append(f"{sprite_names[sheet]}#xywh={x},{y},{THUMB_WIDTH},{THUMB_HEIGHT}")
+        lines.append("")
+
+    return "\n".join(lines)
+
+
+# -------------------------------------------------
+# Scene Index
+# -------------------------------------------------
+
+SCENE_INDEX_VERSION = 1
+
+# Per-frame signalstats keys averaged per scene -> index column name
+SCENE_VIDEO_STATS = {
+    "lavfi.signalstats.YAVG": "yavg",
+    "lavfi.signalstats.YLOW": "ylow",
+    "lavfi.signalstats.YHIGH": "yhigh",
+    "lavfi.signalstats.UAVG": "uavg",
+    "lavfi.signalstats.VAVG": "vavg",
+    "lavfi.signalstats.SATAVG": "satavg",
+}
+
+
+def _read_metadata_log(path):
+    """Yield one {key: value, "pts_time": t} dict per frame from a metadata=print file."""
+    frame = None
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith("frame:"):
+                if frame is not None:
+                    yield frame
+                frame = {"pts_time": float(line.split("pts_time:")[-1].split()[0])}
+            elif frame is not None and "=" in line:
+                key, _, value = line.partition("=")
+                try:
+                    frame[key] = float(value)
+                except ValueError:
+                    continue
+    if frame is not None:
+        yield frame
+
+
+def _scene_loudness(levels):
+    # Mean of momentary loudness in the energy domain (LUFS don't average linearly)
+    levels = [m for m in levels if m > -70]
+    if not levels:
+        return None
+    return round(10 * math.log10(sum(10 ** (m / 10) for m in levels) / len(levels)), 2)
+
+
+def detect_scenes(input_path, duration, has_audio=True, threshold=SCENE_THRESHOLD,
+                  min_duration=SCENE_MIN_DURATION):
+    """Cuts plus per-scene luma/chroma/loudness in one decode, as a columnar scene index."""
+    with tempfile.TemporaryDirectory(prefix="scenes-") as work_dir:
+        video_log = os.path.join(work_dir, "video.log")
+        audio_log = os.path.join(work_dir, "audio.log")
+
+        graph = (
+            f"[0:v]scale=-2:{SCENE_ANALYSIS_HEIGHT},signalstats,"
+            f"scdet=threshold={threshold},"
+            f"metadata=mode=print:file={video_log}[v]"
+        )
+        maps = ["-map", "[v]"]
+        if has_audio:
+            graph += (
+                f";[0:a]ebur128=metadata=1,"
+                f"ametadata=mode=print:key=lavfi.r128.M:file={audio_log}[a]"
+            )
+            maps += ["-map", "[a]"]
+
+        command = [
+            "ffmpeg",
+            "-y",
+            "-i", input_path,
+            "-filter_complex", graph,
+            *maps,
+            "-f", "null",
+            "-"
+        ]
+
+        result = run_command(command)
+        if result.returncode != 0:
+            return None
+
+        # Fold frames into scenes as they are read — nothing per-frame is kept
+        scenes = []
+        current = None
+        for frame in _read_metadata_log(video_log):
+            t = frame["pts_time"]
+            is_cut = "lavfi.scd.time" in frame and current is not None and t - current["start"] >= min_duration
+
+            if current is None or is_cut:
+                if current is not None:
+                    scenes.append(current)
+                current = {
+                    "start": t,
+                    "score": frame.get("lavfi.scd.score", 0.0) if is_cut else 0.0,
+                    "frames": 0,
+                    "sums": dict.fromkeys(SCENE_VIDEO_STATS.values(), 0.0),
+                }
+
+            current["frames"] += 1
+            for key, column in SCENE_VIDEO_STATS.items():
+                current["sums"][column] += frame.get(key, 0.0)
+
+        if current is not None:
+            scenes.append(current)
+
+        audio = []
+        if has_audio and os.path.exists(audio_log):
+            audio = [(f["pts_time"], f["lavfi.r128.M"]) for f in _read_metadata_log(audio_log) if "lavfi.r128.M" in f]
+
+    if scenes:
+        scenes[0]["start"] = 0.0
+
+    columns = {name: [] for name in ("start", "end", "score", *SCENE_VIDEO_STATS.values(), "loudness")}
+    audio_times = [t for t, _ in audio]
+
+    for i, scene in enumerate(scenes):
+        end = scenes[i + 1]["start"] if i + 1 < len(scenes) else duration
+        columns["start"].append(round(scene["start"], 3))
+        columns["end"].append(round(end, 3))
+        columns["score"].append(round(scene["score"], 2))
+        for column, total in scene["sums"].items():
+            columns[column].append(round(total / scene["frames"], 2))
+
+        lo = bisect_right(audio_times, scene["start"])
+        hi = bisect_right(audio_times, end)
+        columns["loudness"].append(_scene_loudness([m for _, m in audio[lo:hi]]))
+
+    return {
+        "version": SCENE_INDEX_VERSION,
+        "duration": duration,
+        "threshold": threshold,
+        "count": len(scenes),
+        "columns": columns,
+    }
+
+
+def scene_at(scene_index, t):
+    """Row index of the scene containing time t (binary search on start)."""
+    starts = scene_index["columns"]["start"]
+    return max(bisect_right(starts, t) - 1, 0) if starts else None
+
+
+def scene_rows(scene_index, start=0, stop=None):
+    """Columnar index -> list of per-scene dicts (for API responses)."""
+    columns = scene_index["columns"]
+    names = list(columns)
+    count = scene_index["count"]
+    return [
+        {name: columns[name][i] for name in names}
+        for i in range(start, min(stop if stop is not None else count, count))
+    ]
+
+
+def cut_points(scene_index, min_score=0.0):
+    """Scene boundaries (excluding 0) — candidate merge/trim points."""
+    columns = scene_index["columns"]
+    return [
+        start for start, score in zip(columns["start"][1:], columns["score"][1:])
+        if score >= min_score
+    ]
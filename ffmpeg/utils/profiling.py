@@ -0,0 +1,174 @@
+import os
+import re
+import resource
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Spans of the trace currently being recorded (None = not tracing)
+_current_trace: ContextVar[list | None] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[str | None] = ContextVar("current_span", default=None)
+
+_SPEED_RE = re.compile(r"speed=\s*([\d.]+)x")
+_FRAME_RE = re.compile(r"frame=\s*(\d+)")
+
+
+# -------------------------------------------------
+# Traces & Spans
+# -------------------------------------------------
+
+@contextmanager
+def trace():
+    """Collect every span recorded inside the block into the yielded list."""
+    spans = []
+    token = _current_trace.set(spans)
+    try:
+        yield spans
+    finally:
+        _current_trace.reset(token)
+
+
+def record_span(span):
+    spans = _current_trace.get()
+    if spans is not None:
+        span.setdefault("parent", _current_span.get())
+        spans.append(span)
+
+
+@contextmanager
+def span(name, **attrs):
+    """
+    Time a block (wall + this process's CPU). The yielded dict can be
+    filled with extra fields, e.g. bytes transferred.
+    """
+    data = {"name": name, **attrs}
+    parent = _current_span.get()
+    token = _current_span.set(name)
+
+    usage_before = resource.getrusage(resource.RUSAGE_SELF)
+    started = time.perf_counter()
+    try:
+        yield data
+    except Exception as e:
+        data["error"] = str(e)
+        raise
+    finally:
+        usage_after = resource.getrusage(resource.RUSAGE_SELF)
+        _current_span.reset(token)
+
+        data["wall_s"] = round(time.perf_counter() - started, 4)
+        data["cpu_s"] = round(
+            (usage_after.ru_utime - usage_before.ru_utime)
+            + (usage_after.ru_stime - usage_before.ru_stime),
+            4,
+        )
+        data["parent"] = parent
+        record_span(data)
+
+
+# -------------------------------------------------
+# Profiled Subprocess Runner
+# -------------------------------------------------
+
+def _read_proc_io(pid):
+    # Linux only — rchar/wchar include network and pipe traffic, so
+    # presigned-URL downloads are counted too
+    try:
+        with open(f"/proc/{pid}/io") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line)
+        return int(fields["rchar"]), int(fields["wchar"])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def _drain(pipe, chunks):
+    chunks.append(pipe.read())
+    pipe.close()
+
+
+def run_profiled(command, name=None):
+    """
+    subprocess.run(capture_output=True, text=True) equivalent that also
+    records a span with the child's CPU time and max RSS (from wait4),
+    bytes read/written (sampled from /proc while it runs) and, for
+    ffmpeg, the final encode speed.
+    """
+    name = name or os.path.basename(command[0])
+
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        command,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+
+    stdout, stderr = [], []
+    readers = [
+        threading.Thread(target=_drain, args=(proc.stdout, stdout), daemon=True),
+        threading.Thread(target=_drain, args=(proc.stderr, stderr), daemon=True),
+    ]
+    for reader in readers:
+        reader.start()
+
+    io = None
+    delay = 0.005
+    while True:
+        pid, status, usage = os.wait4(proc.pid, os.WNOHANG)
+        if pid:
+            break
+        io = _read_proc_io(proc.pid) or io
+        time.sleep(delay)
+        delay = min(delay * 2, 0.25)
+
+    # Reaped by wait4 — tell Popen so it doesn't try again
+    proc.returncode = os.waitstatus_to_exitcode(status)
+
+    for reader in readers:
+        reader.join()
+
+    stdout = stdout[0] if stdout else ""
+    stderr = stderr[0] if stderr else ""
+
+    data = {
+        "name": name,
+        "wall_s": round(time.perf_counter() - started, 4),
+        "cpu_s": round(usage.ru_utime + usage.ru_stime, 4),
+        "max_rss_bytes": usage.ru_maxrss * 1024,  # ru_maxrss is KiB on Linux
+        "read_bytes": io[0] if io else None,
+        "write_bytes": io[1] if io else None,
+        "returncode": proc.returncode,
+    }
+
+    speeds = _SPEED_RE.findall(stderr)
+    if speeds:
+        data["speed"] = float(speeds[-1])
+    frames = _FRAME_RE.findall(stderr)
+    if frames:
+        data["frames"] = int(frames[-1])
+
+    record_span(data)
+
+    return subprocess.CompletedProcess(command, proc.returncode, stdout, stderr)
+
+
+def summarize(spans):
+    """Per-stage totals for a finished trace (top-level spans only)."""
+    stages = {}
+    for s in spans:
+        if s.get("parent") is not None:
+            continue
+        stage = stages.setdefault(s["name"], {"wall_s": 0.0, "cpu_s": 0.0})
+        stage["wall_s"] = round(stage["wall_s"] + s["wall_s"], 4)
+        stage["cpu_s"] = round(stage["cpu_s"] + s["cpu_s"], 4)
+
+    children = [s for s in spans if "max_rss_bytes" in s]
+    return {
+        "stages": stages,
+        "child_cpu_s": round(sum(s["cpu_s"] for s in children), 4),
+        "child_max_rss_bytes": max((s["max_rss_bytes"] for s in children), default=0),
+        "read_bytes": sum(s["read_bytes"] or 0 for s in children),
+        "write_bytes": sum(s["write_bytes"] or 0 for s in children),
+    }